@@ -0,0 +1,30 @@
+"""
+Build the dataset manifest for Shine Skin Collective ML Training
+Crawls the synthetic dataset once and stores every image path and label in a
+single parquet file, so training no longer opens one JSON per image at startup.
+Optionally also decodes every image into a resized uint8 cache for training.
+Re-run this whenever images or annotations change.
+"""
+
+import argparse
+from data_pipeline import SkinDataLoader
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the synthetic dataset manifest')
+    parser.add_argument('--data-root', type=str, default=None,
+                       help='Dataset root (defaults to Synthetic/output_images)')
+    parser.add_argument('--cache-images', action='store_true',
+                       help='Also write the pre-decoded image cache used by training')
+    parser.add_argument('--image-size', type=int, default=224, help='Image size for the image cache')
+    
+    args = parser.parse_args()
+    
+    loader = SkinDataLoader(data_root=args.data_root)
+    loader.build_manifest()
+    if args.cache_images:
+        loader.cache_dataset(image_size=args.image_size)
+
+
+if __name__ == "__main__":
+    main()
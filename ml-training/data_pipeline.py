@@ -5,6 +5,10 @@ Handles loading, preprocessing, and augmentation of synthetic skin images
 
 import os
 import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
 import pandas as pd
 from PIL import Image
@@ -14,22 +18,274 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, MultiLabelBinarizer
 import albumentations as A
 from albumentations.pytorch import ToTensorV2
+from albumentations.core.transforms_interface import ImageOnlyTransform
 import torch
+import torch.nn as nn
 from torch.utils.data import Dataset, DataLoader
+from torch.utils.data.distributed import DistributedSampler
 import torchvision.transforms as transforms
+from torchvision.transforms import v2
+
+try:
+    import pyspng  # Optional: much faster PNG decoding than Pillow
+except ImportError:
+    pyspng = None
+
+try:
+    from numba import njit, prange  # Optional: fused color/noise augmentation kernel
+except ImportError:
+    njit = None
+
+try:
+    import orjson  # Optional: faster parsing of the per-image JSON annotations
+except ImportError:
+    orjson = None
+
+# Below this many annotations, process pool startup costs more than it saves
+PARALLEL_PARSE_MIN_FILES = 2000
+
+
+def parse_annotation_file(json_path: str, condition_names: List[str]) -> Tuple[Dict, Dict]:
+    """Read one JSON annotation and build its per-condition label dict
+    
+    Module-level so it can run in ProcessPoolExecutor workers.
+    """
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    annotation = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    
+    # Extract classification targets
+    classification_targets = annotation.get('classification_targets', {})
+    severity_targets = annotation.get('severity_targets', {})
+    confidence = annotation.get('training_annotations', {}).get('confidence_score', 0.5)
+    
+    # Create label dictionary for this image
+    label_dict = {}
+    for condition in condition_names:
+        label_dict[condition] = {
+            'present': classification_targets.get(condition, False),
+            'severity_level': severity_targets.get(condition, 'mild'),
+            'confidence': confidence
+        }
+    
+    return label_dict, severity_targets
+
+
+def severity_target_array(present: np.ndarray, severity: np.ndarray,
+                          severity_levels: List[str]) -> np.ndarray:
+    """Map (N, C) severity level names to class indices, -1 where the condition is absent
+    
+    Unknown level names fall back to index 0, like the per-image label dicts.
+    """
+    indices = np.zeros(severity.shape, dtype=np.int64)
+    for index, level in enumerate(severity_levels):
+        indices[severity == level] = index
+    return np.where(present, indices, -1)
+
+
+def load_rgb_image(image_path: str) -> np.ndarray:
+    """Decode an image file into an RGB uint8 HWC array"""
+    if pyspng is not None and image_path.endswith('.png'):
+        with open(image_path, 'rb') as f:
+            image = pyspng.load(f.read())
+        # pyspng keeps the PNG's native format; match Pillow's 8-bit RGB output
+        if image.dtype == np.uint16:
+            image = (image >> 8).astype(np.uint8)
+        if image.ndim == 2:
+            image = image[..., np.newaxis]
+        if image.dtype == np.uint8 and image.ndim == 3 and image.shape[-1] in (1, 2, 3, 4):
+            if image.shape[-1] <= 2:
+                # Gray (+ alpha): replicate the gray channel
+                image = np.repeat(image[..., :1], 3, axis=-1)
+            # Dropping an alpha channel leaves a strided view; keep the buffer
+            # contiguous so downstream transforms and ToTensorV2 don't copy again
+            return np.ascontiguousarray(image[..., :3])
+        # Anything else falls back to Pillow below
+    
+    # Pillow decodes straight to RGB, so no BGR->RGB swap is needed
+    with Image.open(image_path) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _fused_color_noise_kernel(img, alpha, beta, apply_hsv, hue_shift, sat_shift, val_shift, noise_std):
+        """Brightness/contrast -> HSV shift -> Gaussian noise in one pass over a uint8 RGB image"""
+        height, width = img.shape[0], img.shape[1]
+        out = np.empty_like(img)
+        for y in prange(height):
+            for x in range(width):
+                r = min(max(img[y, x, 0] * alpha + beta, 0.0), 255.0)
+                g = min(max(img[y, x, 1] * alpha + beta, 0.0), 255.0)
+                b = min(max(img[y, x, 2] * alpha + beta, 0.0), 255.0)
+                
+                if apply_hsv:
+                    # RGB -> HSV with hue in degrees and saturation/value in 0..255
+                    mx = max(r, g, b)
+                    delta = mx - min(r, g, b)
+                    if delta == 0.0:
+                        h = 0.0
+                    elif mx == r:
+                        h = 60.0 * ((g - b) / delta)
+                    elif mx == g:
+                        h = 60.0 * ((b - r) / delta + 2.0)
+                    else:
+                        h = 60.0 * ((r - g) / delta + 4.0)
+                    s = delta / mx * 255.0 if mx > 0.0 else 0.0
+                    
+                    h = (h + hue_shift) % 360.0
+                    s = min(max(s + sat_shift, 0.0), 255.0)
+                    v = min(max(mx + val_shift, 0.0), 255.0)
+                    
+                    # HSV -> RGB
+                    c = v * s / 255.0
+                    hp = h / 60.0
+                    k = c * (1.0 - abs(hp % 2.0 - 1.0))
+                    m = v - c
+                    sector = int(hp) % 6
+                    if sector == 0:
+                        r, g, b = c, k, 0.0
+                    elif sector == 1:
+                        r, g, b = k, c, 0.0
+                    elif sector == 2:
+                        r, g, b = 0.0, c, k
+                    elif sector == 3:
+                        r, g, b = 0.0, k, c
+                    elif sector == 4:
+                        r, g, b = k, 0.0, c
+                    else:
+                        r, g, b = c, 0.0, k
+                    r += m
+                    g += m
+                    b += m
+                
+                if noise_std > 0.0:
+                    r += np.random.normal(0.0, noise_std)
+                    g += np.random.normal(0.0, noise_std)
+                    b += np.random.normal(0.0, noise_std)
+                
+                out[y, x, 0] = np.uint8(min(max(r + 0.5, 0.0), 255.0))
+                out[y, x, 1] = np.uint8(min(max(g + 0.5, 0.0), 255.0))
+                out[y, x, 2] = np.uint8(min(max(b + 0.5, 0.0), 255.0))
+        return out
+
+
+class FusedColorNoise(ImageOnlyTransform):
+    """RandomBrightnessContrast + HueSaturationValue + GaussNoise fused into a
+    single numba kernel, so the image is read and written once instead of
+    going through several uint8/float32 copies. Each stage is still applied
+    with its own probability. Requires numba and uint8 RGB input.
+    """
+    
+    def __init__(self,
+                 brightness_limit: float = 0.2,
+                 contrast_limit: float = 0.2,
+                 hue_shift_limit: int = 20,
+                 sat_shift_limit: int = 30,
+                 val_shift_limit: int = 20,
+                 var_limit: Tuple[float, float] = (10.0, 50.0),
+                 brightness_contrast_p: float = 0.5,
+                 hue_saturation_p: float = 0.5,
+                 gauss_noise_p: float = 0.3,
+                 p: float = 1.0):
+        super().__init__(p=p)
+        self.brightness_limit = brightness_limit
+        self.contrast_limit = contrast_limit
+        self.hue_shift_limit = hue_shift_limit
+        self.sat_shift_limit = sat_shift_limit
+        self.val_shift_limit = val_shift_limit
+        self.var_limit = var_limit
+        self.brightness_contrast_p = brightness_contrast_p
+        self.hue_saturation_p = hue_saturation_p
+        self.gauss_noise_p = gauss_noise_p
+    
+    def apply(self, img, alpha=1.0, beta=0.0, apply_hsv=False, hue_shift=0.0,
+              sat_shift=0.0, val_shift=0.0, noise_std=0.0, **params):
+        return _fused_color_noise_kernel(
+            np.ascontiguousarray(img), alpha, beta, apply_hsv,
+            hue_shift, sat_shift, val_shift, noise_std
+        )
+    
+    def get_params(self):
+        params = {'alpha': 1.0, 'beta': 0.0, 'apply_hsv': False, 'hue_shift': 0.0,
+                  'sat_shift': 0.0, 'val_shift': 0.0, 'noise_std': 0.0}
+        if random.random() < self.brightness_contrast_p:
+            params['alpha'] = 1.0 + random.uniform(-self.contrast_limit, self.contrast_limit)
+            params['beta'] = random.uniform(-self.brightness_limit, self.brightness_limit) * 255.0
+        if random.random() < self.hue_saturation_p:
+            params['apply_hsv'] = True
+            # Hue limit is in OpenCV units (0..180), the kernel works in degrees
+            params['hue_shift'] = 2.0 * random.uniform(-self.hue_shift_limit, self.hue_shift_limit)
+            params['sat_shift'] = random.uniform(-self.sat_shift_limit, self.sat_shift_limit)
+            params['val_shift'] = random.uniform(-self.val_shift_limit, self.val_shift_limit)
+        if random.random() < self.gauss_noise_p:
+            params['noise_std'] = math.sqrt(random.uniform(*self.var_limit))
+        return params
+    
+    def get_transform_init_args_names(self):
+        return ('brightness_limit', 'contrast_limit', 'hue_shift_limit', 'sat_shift_limit',
+                'val_shift_limit', 'var_limit', 'brightness_contrast_p', 'hue_saturation_p',
+                'gauss_noise_p')
+
+
+class GPUAugment(nn.Module):
+    """Batched flip + normalization run on the training device
+    
+    Pairs with create_data_loaders(gpu_augment=True), whose batches stay
+    uint8: the host-to-device copy moves 4x fewer bytes and the workers skip
+    per-sample flipping and normalization. The flip is drawn per sample
+    (v2.RandomHorizontalFlip draws once per call, flipping the whole batch)
+    and only applied in training mode.
+    """
+    
+    def __init__(self, flip_p: float = 0.5,
+                 mean: Tuple[float, ...] = (0.485, 0.456, 0.406),
+                 std: Tuple[float, ...] = (0.229, 0.224, 0.225)):
+        super().__init__()
+        self.flip_p = flip_p
+        self.to_float = v2.ToDtype(torch.float32, scale=True)
+        self.normalize = v2.Normalize(mean=list(mean), std=list(std))
+    
+    def forward(self, images: torch.Tensor) -> torch.Tensor:
+        images = self.to_float(images)
+        if self.training and self.flip_p > 0:
+            flip = torch.rand(images.size(0), 1, 1, 1, device=images.device) < self.flip_p
+            images = torch.where(flip, images.flip(-1), images)
+        return self.normalize(images)
 
 
 class SkinConditionDataset(Dataset):
     """Custom Dataset for skin condition images with multi-label classification"""
     
-    def __init__(self, image_paths: List[str], labels: List[Dict], 
+    def __init__(self, image_paths: List[str], labels: Optional[List[Dict]], 
                  transforms: Optional[A.Compose] = None, 
-                 severity_labels: Optional[List[Dict]] = None):
-        self.image_paths = image_paths
-        self.labels = labels
+                 severity_labels: Optional[List[Dict]] = None,
+                 image_cache_path: Optional[str] = None,
+                 cache_indices: Optional[np.ndarray] = None,
+                 include_meta: bool = False,
+                 targets: Optional[Tuple[torch.Tensor, torch.Tensor]] = None):
+        # Paths are packed into one bytes blob + offsets instead of a list of
+        # str objects, so forked DataLoader workers don't dirty (and copy) the
+        # pages holding them just by touching their refcounts
+        encoded_paths = [path.encode('utf-8') for path in image_paths]
+        self.path_blob = b''.join(encoded_paths)
+        self.path_offsets = np.zeros(len(encoded_paths) + 1, dtype=np.int64)
+        np.cumsum([len(path) for path in encoded_paths], out=self.path_offsets[1:])
+        
         self.severity_labels = severity_labels
         self.transforms = transforms
         
+        # Image path and raw labels are only useful for debugging/evaluation;
+        # leaving them out keeps batches to same-shape tensors for collate
+        self.include_meta = include_meta
+        self.labels = labels if include_meta else None
+        
+        # Optional pre-decoded image cache (see SkinDataLoader.cache_dataset);
+        # cache_indices maps each sample to its row in the cache
+        self.image_cache_path = image_cache_path
+        self.cache_indices = cache_indices
+        self._image_cache = None
+        
         # Define the 7 skin conditions we're classifying
         self.condition_names = [
             'acne', 'aging', 'fine_lines_wrinkles', 'hyperpigmentation',
@@ -40,50 +296,71 @@ class SkinConditionDataset(Dataset):
         self.severity_levels = [
             'slight', 'mild', 'moderate', 'severe', 'advanced', 'early_signs'
         ]
+        
+        # Labels are static, so build the target tensors once up front (or take
+        # the ones SkinDataLoader.load_targets already built)
+        if targets is not None:
+            self.condition_tensor, self.severity_tensor = targets
+        else:
+            self.condition_tensor, self.severity_tensor = self._build_target_tensors(labels)
+    
+    def _build_target_tensors(self, labels: List[Dict]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Convert label dicts into (N, num_conditions) condition and severity tensors"""
+        num_samples = len(labels)
+        num_conditions = len(self.condition_names)
+        severity_index = {level: i for i, level in enumerate(self.severity_levels)}
+        
+        conditions = np.zeros((num_samples, num_conditions), dtype=np.float32)
+        severities = np.full((num_samples, num_conditions), -1, dtype=np.int64)  # -1: condition absent
+        
+        for row, label_dict in enumerate(labels):
+            for col, condition in enumerate(self.condition_names):
+                condition_label = label_dict.get(condition, {})
+                if condition_label.get('present', False):
+                    conditions[row, col] = 1.0
+                    severity = condition_label.get('severity_level', 'mild')
+                    severities[row, col] = severity_index.get(severity, 0)
+        
+        return torch.from_numpy(conditions), torch.from_numpy(severities)
+    
+    def get_image_path(self, idx: int) -> str:
+        start, end = self.path_offsets[idx], self.path_offsets[idx + 1]
+        return self.path_blob[start:end].decode('utf-8')
     
     def __len__(self):
-        return len(self.image_paths)
+        return len(self.path_offsets) - 1
     
     def __getitem__(self, idx):
         # Load image
-        image_path = self.image_paths[idx]
-        image = cv2.imread(image_path)
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        # Load labels
-        label_dict = self.labels[idx]
-        
-        # Create multi-label classification targets
-        condition_targets = []
-        for condition in self.condition_names:
-            condition_targets.append(label_dict.get(condition, {}).get('present', False))
-        
-        # Create severity targets (only for present conditions)
-        severity_targets = []
-        for condition in self.condition_names:
-            if condition_targets[len(severity_targets)]:
-                severity = label_dict.get(condition, {}).get('severity_level', 'mild')
-                severity_targets.append(self.severity_levels.index(severity) if severity in self.severity_levels else 0)
-            else:
-                severity_targets.append(-1)  # No severity for absent conditions
+        image_path = self.get_image_path(idx)
+        if self.image_cache_path is not None:
+            if self._image_cache is None:
+                # Mapped lazily so every worker opens the file itself
+                self._image_cache = np.load(self.image_cache_path, mmap_mode='r')
+            image = np.array(self._image_cache[self.cache_indices[idx]])
+        else:
+            image = load_rgb_image(image_path)
         
         # Apply transforms
         if self.transforms:
-            transformed = self.transforms(image=image)
-            image = transformed['image']
+            image = self.transforms(image=image)['image']
         
-        return {
+        sample = {
             'image': image,
-            'condition_targets': torch.tensor(condition_targets, dtype=torch.float32),
-            'severity_targets': torch.tensor(severity_targets, dtype=torch.long),
-            'image_path': image_path,
-            'original_labels': label_dict
+            'condition_targets': self.condition_tensor[idx],
+            'severity_targets': self.severity_tensor[idx]
         }
+        if self.include_meta:
+            sample['image_path'] = image_path
+            sample['original_labels'] = self.labels[idx]
+        return sample
 
 
 class SkinDataLoader:
     """Data loader class for handling synthetic skin dataset"""
     
+    MANIFEST_NAME = 'manifest.parquet'
+    
     def __init__(self, data_root: Optional[str] = None):
         # Resolve dataset path relative to the repository root by default
         if data_root is None:
@@ -99,69 +376,203 @@ class SkinDataLoader:
             'slight', 'mild', 'moderate', 'severe', 'advanced', 'early_signs'
         ]
     
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.data_root, self.MANIFEST_NAME)
+    
     def load_dataset(self) -> Tuple[List[str], List[Dict], List[Dict]]:
-        """Load all images and their annotations from the synthetic dataset"""
-        image_paths = []
-        labels = []
-        severity_labels = []
-        
-        # Walk through all condition directories
-        for condition_dir in os.listdir(self.data_root):
-            condition_path = os.path.join(self.data_root, condition_dir)
-            if not os.path.isdir(condition_path):
-                continue
+        """Load all images and their annotations from the synthetic dataset
+        
+        Crawls the dataset directory and parses every annotation; training
+        goes through load_targets, which reads the manifest when present.
+        """
+        pairs = list(self._iter_annotated_images())
+        image_paths = [image_path for image_path, _ in pairs]
+        json_paths = [json_path for _, json_path in pairs]
+        
+        # Parse JSON annotations, in parallel for large datasets
+        parse = partial(parse_annotation_file, condition_names=self.condition_names)
+        if len(json_paths) >= PARALLEL_PARSE_MIN_FILES:
+            with ProcessPoolExecutor() as executor:
+                parsed = list(executor.map(parse, json_paths, chunksize=256))
+        else:
+            parsed = [parse(json_path) for json_path in json_paths]
+        
+        labels = [label_dict for label_dict, _ in parsed]
+        severity_labels = [severity_targets for _, severity_targets in parsed]
+        
+        print(f"Loaded {len(image_paths)} images from synthetic dataset")
+        return image_paths, labels, severity_labels
+    
+    def _iter_annotated_images(self):
+        """Yield (image_path, json_path) for every image that has an annotation"""
+        # Walk through all condition directories; every level is sorted by name so
+        # the image order (and the seeded train/val/test split) is reproducible
+        with os.scandir(self.data_root) as condition_entries:
+            condition_entries = sorted(condition_entries, key=lambda entry: entry.name)
+            for condition_entry in condition_entries:
+                if not condition_entry.is_dir():
+                    continue
                 
-            # Skip summary files
-            if condition_dir.endswith('.json') or condition_dir.endswith('.md'):
-                continue
-            
-            print(f"Loading data from {condition_dir}...")
-            
-            # Walk through severity subdirectories
-            for severity_dir in os.listdir(condition_path):
-                severity_path = os.path.join(condition_path, severity_dir)
-                if not os.path.isdir(severity_path):
+                # Skip summary files
+                if condition_entry.name.endswith('.json') or condition_entry.name.endswith('.md'):
                     continue
                 
-                # Load all images and their JSON annotations
-                for filename in os.listdir(severity_path):
-                    if filename.endswith('.png'):
-                        image_path = os.path.join(severity_path, filename)
-                        json_path = os.path.join(severity_path, filename.replace('.png', '.json'))
+                print(f"Loading data from {condition_entry.name}...")
+                
+                # Walk through severity subdirectories
+                with os.scandir(condition_entry.path) as severity_entries:
+                    severity_entries = sorted(severity_entries, key=lambda entry: entry.name)
+                    for severity_entry in severity_entries:
+                        if not severity_entry.is_dir():
+                            continue
                         
-                        if os.path.exists(json_path):
-                            # Load JSON annotation
-                            with open(json_path, 'r') as f:
-                                annotation = json.load(f)
-                            
-                            # Extract classification targets
-                            classification_targets = annotation.get('classification_targets', {})
-                            severity_targets = annotation.get('severity_targets', {})
-                            
-                            # Create label dictionary for this image
-                            label_dict = {}
-                            for condition in self.condition_names:
-                                present = classification_targets.get(condition, False)
-                                severity = severity_targets.get(condition, 'mild')
-                                
-                                label_dict[condition] = {
-                                    'present': present,
-                                    'severity_level': severity,
-                                    'confidence': annotation.get('training_annotations', {}).get('confidence_score', 0.5)
-                                }
-                            
-                            image_paths.append(image_path)
-                            labels.append(label_dict)
-                            severity_labels.append(severity_targets)
+                        # The set is only for the .json lookups; iterate in sorted order
+                        with os.scandir(severity_entry.path) as file_entries:
+                            filenames = {entry.name for entry in file_entries}
+                        
+                        for filename in sorted(filenames):
+                            if not filename.endswith('.png'):
+                                continue
+                            json_name = filename.replace('.png', '.json')
+                            if json_name in filenames:
+                                yield (os.path.join(severity_entry.path, filename),
+                                       os.path.join(severity_entry.path, json_name))
+    
+    def build_manifest(self) -> str:
+        """Crawl the dataset once and write all labels to a single parquet manifest"""
+        image_paths, labels, _ = self.load_dataset()
         
-        print(f"Loaded {len(image_paths)} images from synthetic dataset")
-        return image_paths, labels, severity_labels
+        rows = []
+        for image_path, label_dict in zip(image_paths, labels):
+            row = {'image_path': os.path.relpath(image_path, self.data_root)}
+            for condition in self.condition_names:
+                row[f'{condition}_present'] = bool(label_dict[condition]['present'])
+                row[f'{condition}_severity'] = label_dict[condition]['severity_level']
+            row['confidence'] = float(label_dict[self.condition_names[0]]['confidence'])
+            rows.append(row)
+        
+        pd.DataFrame(rows).to_parquet(self.manifest_path, index=False)
+        print(f"Wrote manifest with {len(rows)} images to {self.manifest_path}")
+        return self.manifest_path
+    
+    def load_targets(self) -> Tuple[List[str], torch.Tensor, torch.Tensor]:
+        """Load image paths with (N, num_conditions) condition and severity targets
+        
+        Reads the prebuilt manifest when present (see build_manifest.py),
+        otherwise crawls and parses the dataset with load_dataset.
+        """
+        if os.path.exists(self.manifest_path):
+            return self._load_manifest()
+        
+        image_paths, labels, _ = self.load_dataset()
+        present = np.array([[label_dict[c]['present'] for c in self.condition_names]
+                            for label_dict in labels], dtype=bool).reshape(-1, len(self.condition_names))
+        severity = np.array([[label_dict[c]['severity_level'] for c in self.condition_names]
+                             for label_dict in labels], dtype=object).reshape(-1, len(self.condition_names))
+        return image_paths, *self._target_tensors(present, severity)
+    
+    def _target_tensors(self, present: np.ndarray, severity: np.ndarray) -> Tuple[torch.Tensor, torch.Tensor]:
+        conditions = torch.from_numpy(present.astype(np.float32))
+        severities = torch.from_numpy(severity_target_array(present, severity, self.severity_levels))
+        return conditions, severities
+    
+    def _load_manifest(self) -> Tuple[List[str], torch.Tensor, torch.Tensor]:
+        """Load image paths and target tensors column-wise from the parquet manifest"""
+        df = pd.read_parquet(self.manifest_path)
+        
+        image_paths = (self.data_root + os.sep + df['image_path']).tolist()
+        present = df[[f'{c}_present' for c in self.condition_names]].to_numpy(dtype=bool)
+        severity = df[[f'{c}_severity' for c in self.condition_names]].to_numpy()
+        
+        print(f"Loaded {len(image_paths)} images from manifest {self.manifest_path}")
+        return image_paths, *self._target_tensors(present, severity)
     
-    def get_train_transforms(self, image_size: int = 224) -> A.Compose:
-        """Get training data augmentation transforms"""
+    def image_cache_path(self, image_size: int = 224) -> str:
+        return os.path.join(self.data_root, f'image_cache_{image_size}.npy')
+    
+    def cache_dataset(self, image_size: int = 224, out_path: Optional[str] = None) -> str:
+        """Decode and resize every image once into a uint8 (N, S, S, 3) memmap
+        
+        Training then reads fixed-size pixels from the cache instead of
+        decoding and resizing each PNG every epoch. The relative image paths
+        are saved alongside so a stale cache can be detected.
+        """
+        image_paths, _, _ = self.load_targets()
+        out_path = out_path or self.image_cache_path(image_size)
+        
+        cache = np.lib.format.open_memmap(
+            out_path, mode='w+', dtype=np.uint8,
+            shape=(len(image_paths), image_size, image_size, 3)
+        )
+        for i, image_path in enumerate(image_paths):
+            image = load_rgb_image(image_path)
+            cache[i] = cv2.resize(image, (image_size, image_size), interpolation=cv2.INTER_AREA)
+            if (i + 1) % 1000 == 0:
+                print(f"Cached {i + 1}/{len(image_paths)} images...")
+        cache.flush()
+        del cache
+        
+        np.save(self._cache_index_path(out_path), self._relative_paths(image_paths))
+        print(f"Wrote image cache with {len(image_paths)} images to {out_path}")
+        return out_path
+    
+    def _cache_index_path(self, cache_path: str) -> str:
+        return cache_path[:-len('.npy')] + '_paths.npy'
+    
+    def _relative_paths(self, image_paths: List[str]) -> np.ndarray:
+        return np.array([os.path.relpath(path, self.data_root) for path in image_paths])
+    
+    def _find_image_cache(self, image_paths: List[str], image_size: int) -> Optional[str]:
+        """Return the image cache path if one exists and matches image_paths"""
+        cache_path = self.image_cache_path(image_size)
+        index_path = self._cache_index_path(cache_path)
+        if not (os.path.exists(cache_path) and os.path.exists(index_path)):
+            return None
+        
+        if not np.array_equal(np.load(index_path), self._relative_paths(image_paths)):
+            print(f"Image cache {cache_path} is stale, decoding images from disk")
+            return None
+        
+        print(f"Using image cache {cache_path}")
+        return cache_path
+    
+    def get_train_transforms(self, image_size: int = 224, gpu_augment: bool = False) -> A.Compose:
+        """Get training data augmentation transforms
+        
+        With `gpu_augment=True` the flip and normalization are left to
+        GPUAugment and the output stays a uint8 tensor.
+        """
+        if njit is not None:
+            color_noise = [FusedColorNoise()]
+        else:
+            color_noise = [
+                A.RandomBrightnessContrast(
+                    brightness_limit=0.2,
+                    contrast_limit=0.2,
+                    p=0.5
+                ),
+                A.HueSaturationValue(
+                    hue_shift_limit=20,
+                    sat_shift_limit=30,
+                    val_shift_limit=20,
+                    p=0.5
+                ),
+                A.GaussNoise(var_limit=(10.0, 50.0), p=0.3),
+            ]
+        
+        flip = [] if gpu_augment else [A.HorizontalFlip(p=0.5)]
+        normalize = [] if gpu_augment else [
+            A.Normalize(
+                mean=[0.485, 0.456, 0.406],
+                std=[0.229, 0.224, 0.225]
+            )
+        ]
+        
         return A.Compose([
-            A.Resize(image_size, image_size),
-            A.HorizontalFlip(p=0.5),
+            # INTER_AREA is both faster and cleaner than bilinear for downscaling
+            A.Resize(image_size, image_size, interpolation=cv2.INTER_AREA),
+            *flip,
             A.RandomRotate90(p=0.3),
             A.ShiftScaleRotate(
                 shift_limit=0.1,
@@ -169,84 +580,98 @@ class SkinDataLoader:
                 rotate_limit=15,
                 p=0.5
             ),
-            A.RandomBrightnessContrast(
-                brightness_limit=0.2,
-                contrast_limit=0.2,
-                p=0.5
-            ),
-            A.HueSaturationValue(
-                hue_shift_limit=20,
-                sat_shift_limit=30,
-                val_shift_limit=20,
-                p=0.5
-            ),
-            A.GaussNoise(var_limit=(10.0, 50.0), p=0.3),
-            A.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
-            ),
+            *color_noise,
+            *normalize,
             ToTensorV2()
         ])
     
-    def get_val_transforms(self, image_size: int = 224) -> A.Compose:
+    def get_val_transforms(self, image_size: int = 224, gpu_augment: bool = False) -> A.Compose:
         """Get validation data transforms (no augmentation)"""
-        return A.Compose([
-            A.Resize(image_size, image_size),
+        normalize = [] if gpu_augment else [
             A.Normalize(
                 mean=[0.485, 0.456, 0.406],
                 std=[0.229, 0.224, 0.225]
-            ),
+            )
+        ]
+        
+        return A.Compose([
+            A.Resize(image_size, image_size, interpolation=cv2.INTER_AREA),
+            *normalize,
             ToTensorV2()
         ])
     
     def create_data_loaders(self, batch_size: int = 32, 
                            train_split: float = 0.7,
                            val_split: float = 0.15,
-                           image_size: int = 224) -> Tuple[DataLoader, DataLoader, DataLoader]:
-        """Create train, validation, and test data loaders"""
+                           image_size: int = 224,
+                           num_workers: Optional[int] = None,
+                           pin_memory: Optional[bool] = None,
+                           persistent_workers: bool = True,
+                           prefetch_factor: int = 4,
+                           distributed: bool = False,
+                           gpu_augment: bool = False) -> Tuple[DataLoader, DataLoader, DataLoader]:
+        """Create train, validation, and test data loaders
+        
+        Batches are pinned when CUDA is available, so callers should move them
+        with `.to(device, non_blocking=True)` to overlap the copy with compute.
+        With `distributed=True` the training set is sharded across processes
+        with a DistributedSampler; call `train_loader.sampler.set_epoch(epoch)`
+        every epoch to reshuffle. With `gpu_augment=True` images come out as
+        uint8 tensors; run them through GPUAugment on the device.
+        """
+        if num_workers is None:
+            num_workers = min(os.cpu_count() or 1, 8)
+        if pin_memory is None:
+            pin_memory = torch.cuda.is_available()
+        
+        loader_kwargs = {'num_workers': num_workers, 'pin_memory': pin_memory}
+        if num_workers > 0:
+            # Keep workers alive across epochs and let them run ahead of training
+            loader_kwargs['persistent_workers'] = persistent_workers
+            loader_kwargs['prefetch_factor'] = prefetch_factor
         
         # Load dataset
-        image_paths, labels, severity_labels = self.load_dataset()
+        image_paths, condition_targets, severity_targets = self.load_targets()
+        image_cache_path = self._find_image_cache(image_paths, image_size)
+        indices = np.arange(len(image_paths))
         
-        # Split data
-        train_paths, temp_paths, train_labels, temp_labels = train_test_split(
-            image_paths, labels, test_size=(1-train_split), random_state=42
+        # Split indices; they address paths, targets and the image cache alike
+        train_idx, temp_idx = train_test_split(
+            indices, test_size=(1-train_split), random_state=42
         )
         
-        val_paths, test_paths, val_labels, test_labels = train_test_split(
-            temp_paths, temp_labels, 
-            test_size=(1-val_split/(1-train_split)), random_state=42
+        val_idx, test_idx = train_test_split(
+            temp_idx, test_size=(1-val_split/(1-train_split)), random_state=42
         )
         
-        print(f"Train: {len(train_paths)}, Val: {len(val_paths)}, Test: {len(test_paths)}")
+        print(f"Train: {len(train_idx)}, Val: {len(val_idx)}, Test: {len(test_idx)}")
         
-        # Create datasets
-        train_dataset = SkinConditionDataset(
-            train_paths, train_labels, 
-            transforms=self.get_train_transforms(image_size)
-        )
-        
-        val_dataset = SkinConditionDataset(
-            val_paths, val_labels,
-            transforms=self.get_val_transforms(image_size)
-        )
+        def make_dataset(split_idx, split_transforms):
+            return SkinConditionDataset(
+                [image_paths[i] for i in split_idx], None,
+                transforms=split_transforms,
+                image_cache_path=image_cache_path, cache_indices=split_idx,
+                targets=(condition_targets[split_idx], severity_targets[split_idx])
+            )
         
-        test_dataset = SkinConditionDataset(
-            test_paths, test_labels,
-            transforms=self.get_val_transforms(image_size)
-        )
+        # Create datasets
+        train_dataset = make_dataset(train_idx, self.get_train_transforms(image_size, gpu_augment))
+        val_dataset = make_dataset(val_idx, self.get_val_transforms(image_size, gpu_augment))
+        test_dataset = make_dataset(test_idx, self.get_val_transforms(image_size, gpu_augment))
         
         # Create data loaders
+        train_sampler = DistributedSampler(train_dataset, shuffle=True) if distributed else None
         train_loader = DataLoader(
-            train_dataset, batch_size=batch_size, shuffle=True, num_workers=4
+            train_dataset, batch_size=batch_size, shuffle=train_sampler is None,
+            sampler=train_sampler, **loader_kwargs
         )
         
         val_loader = DataLoader(
-            val_dataset, batch_size=batch_size, shuffle=False, num_workers=4
+            val_dataset, batch_size=batch_size, shuffle=False, **loader_kwargs
         )
         
         test_loader = DataLoader(
-            test_dataset, batch_size=batch_size, shuffle=False, num_workers=4
+            test_dataset, batch_size=batch_size, shuffle=False, **loader_kwargs
         )
         
         return train_loader, val_loader, test_loader
@@ -264,6 +689,8 @@ def analyze_dataset_distribution(data_loader: DataLoader) -> Dict:
     ]}
     
     total_samples = 0
+    condition_totals = torch.zeros(len(condition_counts))
+    severity_totals = torch.zeros(len(severity_counts), dtype=torch.long)
     
     for batch in data_loader:
         condition_targets = batch['condition_targets']
@@ -272,15 +699,14 @@ def analyze_dataset_distribution(data_loader: DataLoader) -> Dict:
         total_samples += condition_targets.size(0)
         
         # Count conditions
-        for i, condition in enumerate(condition_counts.keys()):
-            condition_counts[condition] += condition_targets[:, i].sum().item()
+        condition_totals += condition_targets.sum(dim=0).cpu()
         
         # Count severities
-        for batch_idx in range(severity_targets.size(0)):
-            for condition_idx in range(severity_targets.size(1)):
-                severity_idx = severity_targets[batch_idx, condition_idx].item()
-                if severity_idx >= 0:  # Valid severity
-                    severity_counts[list(severity_counts.keys())[severity_idx]] += 1
+        valid_severities = severity_targets[severity_targets >= 0]  # Valid severity
+        severity_totals += torch.bincount(valid_severities, minlength=len(severity_counts)).cpu()
+    
+    condition_counts = dict(zip(condition_counts.keys(), condition_totals.tolist()))
+    severity_counts = dict(zip(severity_counts.keys(), severity_totals.tolist()))
     
     # Calculate percentages
     condition_percentages = {
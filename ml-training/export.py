@@ -0,0 +1,119 @@
+"""
+Export the trained Shine Skin Collective model for inference-only runtimes
+Writes TorchScript and/or ONNX versions of MultiLabelSkinClassifier with
+tuple outputs (condition_logits, severity_logits, features), and can build a
+TensorRT engine from the ONNX file with trtexec.
+"""
+
+import os
+import shutil
+import argparse
+import subprocess
+import torch
+import torch.nn as nn
+from typing import Optional, Tuple
+
+from model_architecture import load_checkpoint_model
+
+OUTPUT_NAMES = ['condition_logits', 'severity_logits', 'features']
+
+
+class ExportWrapper(nn.Module):
+    """Expose the model's tuple-returning forward path for tracing/export"""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        return self.model._forward_tensors(x)
+
+
+def export_torchscript(model: nn.Module, output_path: str, image_size: int = 224) -> str:
+    """Trace the model into a TorchScript archive"""
+    example = torch.randn(1, 3, image_size, image_size, device=next(model.parameters()).device)
+    with torch.inference_mode():
+        traced = torch.jit.trace(ExportWrapper(model).eval(), example)
+    torch.jit.save(traced, output_path)
+    print(f"Saved TorchScript model: {output_path}")
+    return output_path
+
+
+def export_onnx(model: nn.Module, output_path: str, image_size: int = 224, opset_version: int = 17) -> str:
+    """Export the model to ONNX with a dynamic batch dimension"""
+    dummy = torch.randn(1, 3, image_size, image_size, device=next(model.parameters()).device)
+    dynamic_axes = {name: {0: 'batch'} for name in ['input'] + OUTPUT_NAMES}
+    with torch.no_grad():
+        torch.onnx.export(
+            ExportWrapper(model).eval(),
+            (dummy,),
+            output_path,
+            input_names=['input'],
+            output_names=OUTPUT_NAMES,
+            dynamic_axes=dynamic_axes,
+            opset_version=opset_version
+        )
+    print(f"Saved ONNX model: {output_path}")
+    return output_path
+
+
+def build_trt_engine(onnx_path: str, engine_path: Optional[str] = None, fp16: bool = True) -> str:
+    """Build a serialized TensorRT engine from an ONNX model using trtexec"""
+    trtexec = shutil.which('trtexec')
+    if trtexec is None:
+        raise RuntimeError("trtexec not found on PATH; install TensorRT to build an engine")
+
+    engine_path = engine_path or os.path.splitext(onnx_path)[0] + '.plan'
+    command = [trtexec, f'--onnx={onnx_path}', f'--saveEngine={engine_path}']
+    if fp16:
+        command.append('--fp16')
+
+    subprocess.run(command, check=True)
+    print(f"Saved TensorRT engine: {engine_path}")
+    return engine_path
+
+
+def export_model(checkpoint_path: str,
+                 output_dir: str = 'exports',
+                 export_format: str = 'all',
+                 image_size: int = 224,
+                 build_trt: bool = False,
+                 fp16: bool = True):
+    """Export a checkpoint to the requested formats"""
+    os.makedirs(output_dir, exist_ok=True)
+    # strict: a checkpoint that doesn't match the architecture must fail, not export random heads
+    model = load_checkpoint_model(checkpoint_path, strict=True)
+
+    if export_format in ('torchscript', 'all'):
+        export_torchscript(model, os.path.join(output_dir, 'model.pt'), image_size)
+
+    if export_format in ('onnx', 'all'):
+        onnx_path = export_onnx(model, os.path.join(output_dir, 'model.onnx'), image_size)
+        if build_trt:
+            build_trt_engine(onnx_path, fp16=fp16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the skin condition model for inference')
+    parser.add_argument('--checkpoint', type=str, default='checkpoints/best_model.pth', help='Training checkpoint')
+    parser.add_argument('--output-dir', type=str, default='exports', help='Directory for exported models')
+    parser.add_argument('--format', type=str, default='all', choices=['torchscript', 'onnx', 'all'],
+                       help='Export format')
+    parser.add_argument('--image-size', type=int, default=224, help='Input image size')
+    parser.add_argument('--trt', action='store_true', help='Also build a TensorRT engine from the ONNX model')
+    parser.add_argument('--no-fp16', action='store_true', help='Build the TensorRT engine in FP32')
+
+    args = parser.parse_args()
+
+    export_model(
+        checkpoint_path=args.checkpoint,
+        output_dir=args.output_dir,
+        export_format=args.format,
+        image_size=args.image_size,
+        build_trt=args.trt,
+        fp16=not args.no_fp16
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 import torch
-from torchvision import transforms
 from PIL import Image
 import io
 import os
+import asyncio
+import threading
 import numpy as np
+import cv2
 
-from model_architecture import create_model
+from model_architecture import load_checkpoint_model, quantize_int8
 import mediapipe as mp
 
 
@@ -24,28 +26,68 @@ class InferenceResponse(BaseModel):
 
 
 def load_model(checkpoint_path: str, device: str = "cpu"):
-    checkpoint = torch.load(checkpoint_path, map_location=device)
-    # Get model name from checkpoint config, default to efficientnet-b0
-    model_name = checkpoint.get("config", {}).get("model_name", "efficientnet-b0")
-    print(f"Loading model: {model_name}")
-    model = create_model(model_name, pretrained=False)
-    model.load_state_dict(checkpoint["model_state_dict"], strict=False)
-    model.eval()
-    model.to(device)
-    return model
+    return load_checkpoint_model(checkpoint_path, device=device, strict=False)
+
+
+def quantize_model(model, num_calibration_images: int = 100):
+    """Post-training static int8 quantization (FBGEMM) for CPU serving.
+
+    Calibrates activation ranges on validation images and returns a
+    TorchScript module, since the quantized graph can't be loaded back into
+    the fp32 model class.
+    """
+    from data_pipeline import SkinDataLoader
+
+    batch_size = 16
+    _, val_loader, _ = SkinDataLoader().create_data_loaders(batch_size=batch_size, num_workers=0)
+    num_batches = -(-num_calibration_images // batch_size)
+    quantized = quantize_int8(model, val_loader, num_calibration_batches=num_batches)
+
+    example = torch.randn(1, 3, 224, 224)
+    return torch.jit.trace(quantized, example, strict=False)
 
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 CHECKPOINT = os.getenv("MODEL_CHECKPOINT", "ml-training/checkpoints/best_model.pth")
-model = load_model(CHECKPOINT, device=device)
-
-preprocess = transforms.Compose(
-    [
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-    ]
-)
+INT8_CHECKPOINT = os.getenv("MODEL_INT8_CHECKPOINT", os.path.splitext(CHECKPOINT)[0] + "_int8.pth")
+
+# On CPU serve the int8 model when one has been built. Set QUANTIZE_INT8=1 to
+# build it from the fp32 checkpoint on startup (needs the training dataset).
+if device == "cpu" and os.path.exists(INT8_CHECKPOINT):
+    print(f"Loading int8 model: {INT8_CHECKPOINT}")
+    model = torch.jit.load(INT8_CHECKPOINT)
+else:
+    model = load_model(CHECKPOINT, device=device)
+    if device == "cpu" and os.getenv("QUANTIZE_INT8", "0") == "1":
+        model = quantize_model(model)
+        torch.jit.save(model, INT8_CHECKPOINT)
+        print(f"Saved int8 model: {INT8_CHECKPOINT}")
+
+# Optionally compile the model to cut per-call Python dispatch overhead.
+# Off by default: the first request per batch shape pays the compile cost.
+# Default mode, not "reduce-overhead": its CUDA graphs re-record for every new
+# ROI batch size and are not safe to replay from the asyncio.to_thread workers.
+if os.getenv("COMPILE_MODEL", "0") == "1" and hasattr(torch, "compile") and not isinstance(model, torch.jit.ScriptModule):
+    model = torch.compile(model)
+
+# FaceMesh loads its TFLite graphs on construction, so build it once
+FACE_MESH = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, refine_landmarks=True)
+# The MediaPipe graph is not safe to run concurrently from several threads
+FACE_MESH_LOCK = threading.Lock()
+
+IMAGE_SIZE = (224, 224)
+MEAN = torch.tensor([0.485, 0.456, 0.406], device=device).view(3, 1, 1)
+STD = torch.tensor([0.229, 0.224, 0.225], device=device).view(3, 1, 1)
+
+
+def preprocess(image) -> torch.Tensor:
+    """Resize and normalize a PIL image or RGB uint8 HWC array on `device`,
+    returning a (3, 224, 224) tensor"""
+    # Resize as uint8 on the CPU (INTER_AREA, like the training transforms),
+    # then share the fresh array with torch and normalize in place
+    arr = cv2.resize(np.asarray(image), IMAGE_SIZE, interpolation=cv2.INTER_AREA)
+    t = torch.from_numpy(arr).to(device, non_blocking=True).permute(2, 0, 1)
+    return t.float().div_(255.0).sub_(MEAN).div_(STD)
 
 app = FastAPI()
 app.add_middleware(
@@ -62,32 +104,66 @@ def health():
     return {"status": "ok"}
 
 
-@app.post("/infer", response_model=InferenceResponse)
-async def infer(image: UploadFile = File(...)):
-    if not image.content_type or not image.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Invalid file type")
-    data = await image.read()
+def run_pipeline(data: bytes) -> dict:
+    """Decode an uploaded image and score the full face plus facial regions"""
     pil = Image.open(io.BytesIO(data)).convert("RGB")
-    tensor = preprocess(pil).unsqueeze(0).to(device)
 
-    # Prepare face mesh to get regions
-    mp_face_mesh = mp.solutions.face_mesh
-    mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, refine_landmarks=True)
     region_concerns = None
 
     # Run face mesh on original image for ROI masks
     img_np = np.array(pil)
-    results = mesh.process(img_np)
+    with FACE_MESH_LOCK:
+        results = FACE_MESH.process(img_np)
+    full_tensor = preprocess(img_np)
+
+    # If landmarks found, crop simple polygon ROIs so they can be scored in
+    # the same forward pass as the full face
+    roi_tensors = {}
+    try:
+        if results.multi_face_landmarks:
+            h, w = img_np.shape[:2]
+            lm = results.multi_face_landmarks[0].landmark
 
-    # Helper to run model on a PIL image crop
-    def run_infer_on_pil(p: Image.Image):
-        t = preprocess(p).unsqueeze(0).to(device)
-        with torch.no_grad():
-            return model(t)
+            def pts(idxs):
+                return [(int(lm[i].x * w), int(lm[i].y * h)) for i in idxs]
+
+            # Basic ROI index groups (approx): cheeks, forehead, nose (T-zone), chin, eyes
+            left_cheek_idx = [234, 93, 137, 177, 215, 227, 234]
+            right_cheek_idx = [454, 323, 361, 401, 429, 447, 454]
+            forehead_idx = [10, 338, 297, 332, 284, 251, 389, 356, 454, 234, 127, 162, 10]
+            nose_tzone_idx = [168, 6, 197, 195, 5, 4, 45, 275, 4, 195, 197, 6, 168]
+            chin_idx = [152, 377, 400, 379, 365, 397, 365, 379, 400, 377, 152]
+
+            rois = {
+                "left_cheek": pts(left_cheek_idx),
+                "right_cheek": pts(right_cheek_idx),
+                "forehead": pts(forehead_idx),
+                "t_zone": pts(nose_tzone_idx),
+                "chin": pts(chin_idx),
+            }
 
-    # Full-face inference
-    outputs = run_infer_on_pil(pil)
-    condition_probs = outputs["condition_logits"].cpu().numpy().tolist()[0]
+            for name, poly in rois.items():
+                poly = np.array(poly, dtype=np.int32)
+
+                # Crop bbox around polygon to reduce empty space, then mask
+                # only that region instead of the full frame
+                x0, y0 = np.maximum(poly.min(axis=0), 0)
+                x1, y1 = np.minimum(poly.max(axis=0), [w, h])
+                mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+                cv2.fillPoly(mask, [(poly - [x0, y0]).astype(np.int32)], 1)
+                crop = img_np[y0:y1, x0:x1] * mask[..., None]
+                roi_tensors[name] = preprocess(crop)
+    except Exception:
+        # If anything fails, just skip regions
+        roi_tensors = {}
+
+    # Full face plus every ROI in a single batch: [1 + num_rois, 3, 224, 224]
+    batch = torch.stack([full_tensor] + list(roi_tensors.values()))
+    # fp16 autocast on GPU; the CPU path runs fp32 or the int8 model
+    with torch.inference_mode(), torch.autocast("cuda", dtype=torch.float16, enabled=device == "cuda"):
+        outputs = model(batch)
+    all_probs = torch.sigmoid(outputs["condition_logits"].float()).cpu().numpy().tolist()
+    condition_probs = all_probs[0]
     condition_names = [
         "acne",
         "aging",
@@ -113,54 +189,26 @@ async def infer(image: UploadFile = File(...)):
             "description": "",  # filled on frontend/mock
         })
 
-    # If landmarks found, compute simple polygon ROIs and run per-ROI inference
-    try:
-        if results.multi_face_landmarks:
-            h, w = img_np.shape[:2]
-            lm = results.multi_face_landmarks[0].landmark
-
-            def pts(idxs):
-                return [(int(lm[i].x * w), int(lm[i].y * h)) for i in idxs]
-
-            # Basic ROI index groups (approx): cheeks, forehead, nose (T-zone), chin, eyes
-            left_cheek_idx = [234, 93, 137, 177, 215, 227, 234]
-            right_cheek_idx = [454, 323, 361, 401, 429, 447, 454]
-            forehead_idx = [10, 338, 297, 332, 284, 251, 389, 356, 454, 234, 127, 162, 10]
-            nose_tzone_idx = [168, 6, 197, 195, 5, 4, 45, 275, 4, 195, 197, 6, 168]
-            chin_idx = [152, 377, 400, 379, 365, 397, 365, 379, 400, 377, 152]
+    # Per-ROI results come from rows 1.. of the batch
+    if roi_tensors:
+        region_concerns = {}
+        for name, probs in zip(roi_tensors, all_probs[1:]):
+            region_concerns[name] = [
+                {"name": cn.replace("_", " ").title(), "severity": ("mild" if p < 0.2 else "moderate" if p < 0.4 else "severe"), "percentage": round(p * 100)}
+                for cn, p in zip(condition_names, probs)
+            ]
 
-            rois = {
-                "left_cheek": pts(left_cheek_idx),
-                "right_cheek": pts(right_cheek_idx),
-                "forehead": pts(forehead_idx),
-                "t_zone": pts(nose_tzone_idx),
-                "chin": pts(chin_idx),
-            }
+    return {"concerns": concerns, "region_concerns": region_concerns}
 
-            region_concerns = {}
-            for name, poly in rois.items():
-                mask = Image.new('L', (w, h), 0)
-                import PIL.ImageDraw as ImageDraw
-                ImageDraw.Draw(mask).polygon(poly, outline=1, fill=1)
-                masked = Image.new('RGB', (w, h))
-                masked.paste(pil, mask=mask)
-
-                # Crop bbox around polygon to reduce empty space
-                xs = [p[0] for p in poly]
-                ys = [p[1] for p in poly]
-                bbox = (max(min(xs), 0), max(min(ys), 0), min(max(xs), w), min(max(ys), h))
-                crop = masked.crop(bbox)
-                out_roi = run_infer_on_pil(crop)
-                probs = out_roi["condition_logits"].cpu().numpy().tolist()[0]
-                region_concerns[name] = [
-                    {"name": cn.replace("_", " ").title(), "severity": ("mild" if p < 0.2 else "moderate" if p < 0.4 else "severe"), "percentage": round(p * 100)}
-                    for cn, p in zip(condition_names, probs)
-                ]
-    except Exception:
-        # If anything fails, just skip regions
-        region_concerns = None
 
-    return {"concerns": concerns, "region_concerns": region_concerns}
+@app.post("/infer", response_model=InferenceResponse)
+async def infer(image: UploadFile = File(...)):
+    if not image.content_type or not image.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    data = await image.read()
+    # Decode, face mesh and inference block for hundreds of ms, so run them
+    # in a worker thread to keep the event loop serving other requests
+    return await asyncio.to_thread(run_pipeline, data)
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ Model Architecture for Multi-label Skin Condition Classification
 Supports both condition detection and severity prediction
 """
 
+import copy
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -26,6 +27,10 @@ def _normalize_timm_model_name(model_name: str) -> str:
         'efficientnet-b0': 'efficientnet_b0',
         'efficientnet-b3': 'efficientnet_b3',
         'vit-base-patch16-224': 'vit_base_patch16_224',
+        # Lightweight backbones for deployment
+        'efficientnet-lite0': 'efficientnet_lite0',
+        'mobilenetv3-small': 'mobilenetv3_small_100',
+        'mobilenetv3-large': 'mobilenetv3_large_100',
         # Pass-through for common resnets
         'resnet50': 'resnet50',
         'resnet101': 'resnet101',
@@ -37,6 +42,131 @@ def _normalize_timm_model_name(model_name: str) -> str:
     # Fallback: replace hyphens with underscores
     return lower.replace('-', '_')
 
+def _to_channels_last(x: torch.Tensor) -> torch.Tensor:
+    """Convert a 4D input to channels-last, leaving other inputs untouched"""
+    if x.dim() == 4 and not x.is_contiguous(memory_format=torch.channels_last):
+        x = x.contiguous(memory_format=torch.channels_last)
+    return x
+
+
+def _flatten_pooled(features: torch.Tensor) -> torch.Tensor:
+    """Average a 4D feature map over H x W; pooled features pass through"""
+    if features.dim() == 4:
+        features = features.mean(dim=(2, 3))
+    return features
+
+
+# Keep these shape checks out of FX graphs (used by int8 quantization in inference_server)
+torch.fx.wrap('_to_channels_last')
+torch.fx.wrap('_flatten_pooled')
+
+
+class ClassificationHead(nn.Module):
+    """
+    Linear -> ReLU -> Dropout -> Linear head written with functional calls
+    
+    ReLU runs in place on the first Linear's output and dropout is applied
+    only to the hidden layer, so no extra masked copy of the input is made.
+    """
+    
+    def __init__(self,
+                 in_features: int,
+                 hidden_dim: int,
+                 out_features: int,
+                 dropout_rate: float = 0.3):
+        super(ClassificationHead, self).__init__()
+        
+        self.dropout_rate = dropout_rate
+        self.fc1 = nn.Linear(in_features, hidden_dim)
+        self.fc2 = nn.Linear(hidden_dim, out_features)
+        
+        self._register_load_state_dict_pre_hook(self._upgrade_sequential_keys)
+    
+    def _upgrade_sequential_keys(self, state_dict, prefix, *args):
+        """Convert checkpoints saved with the old nn.Sequential head"""
+        # Old layout: 1 = first Linear, 4 = second Linear
+        for old, new in (('1', 'fc1'), ('4', 'fc2')):
+            for param in ('weight', 'bias'):
+                key = f'{prefix}{old}.{param}'
+                if key in state_dict:
+                    state_dict[f'{prefix}{new}.{param}'] = state_dict.pop(key)
+    
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        hidden = F.relu_(self.fc1(x))
+        hidden = F.dropout(hidden, self.dropout_rate, self.training)
+        return self.fc2(hidden)
+
+
+class GroupedSeverityHead(nn.Module):
+    """
+    Severity heads for all conditions evaluated as two batched GEMMs
+    
+    Equivalent to one Linear -> ReLU -> Dropout -> Linear stack per
+    condition, but the first layers are fused into a single Linear and the
+    second layers into one batched einsum instead of a Python loop.
+    """
+    
+    def __init__(self,
+                 in_features: int,
+                 num_conditions: int,
+                 num_classes: int,
+                 hidden_dim: int = 256,
+                 dropout_rate: float = 0.3):
+        super(GroupedSeverityHead, self).__init__()
+        
+        self.num_conditions = num_conditions
+        self.hidden_dim = hidden_dim
+        self.dropout_rate = dropout_rate
+        
+        self.fc1 = nn.Linear(in_features, num_conditions * hidden_dim)
+        # Per-condition second layer: (num_conditions, hidden_dim, num_classes)
+        self.weight = nn.Parameter(torch.empty(num_conditions, hidden_dim, num_classes))
+        self.bias = nn.Parameter(torch.zeros(num_conditions, num_classes))
+        
+        self.reset_parameters()
+        self._register_load_state_dict_pre_hook(self._upgrade_per_condition_keys)
+    
+    def reset_parameters(self):
+        """Initialize each condition's block like its own xavier-initialized Linear"""
+        for block in self.fc1.weight.data.view(self.num_conditions, self.hidden_dim, -1):
+            nn.init.xavier_uniform_(block)
+        nn.init.constant_(self.fc1.bias, 0)
+        for block in self.weight.data:
+            nn.init.xavier_uniform_(block)
+        nn.init.constant_(self.bias, 0)
+    
+    def _upgrade_per_condition_keys(self, state_dict, prefix, *args):
+        """Convert checkpoints saved with the old ModuleList of per-condition heads"""
+        if f'{prefix}0.1.weight' not in state_dict:
+            return
+        
+        # Old layout per condition i: {i}.1 = first Linear, {i}.4 = second Linear
+        fc1_weights, fc1_biases, fc2_weights, fc2_biases = [], [], [], []
+        for i in range(self.num_conditions):
+            fc1_weights.append(state_dict.pop(f'{prefix}{i}.1.weight'))
+            fc1_biases.append(state_dict.pop(f'{prefix}{i}.1.bias'))
+            fc2_weights.append(state_dict.pop(f'{prefix}{i}.4.weight').t())
+            fc2_biases.append(state_dict.pop(f'{prefix}{i}.4.bias'))
+        
+        state_dict[f'{prefix}fc1.weight'] = torch.cat(fc1_weights)
+        state_dict[f'{prefix}fc1.bias'] = torch.cat(fc1_biases)
+        state_dict[f'{prefix}weight'] = torch.stack(fc2_weights)
+        state_dict[f'{prefix}bias'] = torch.stack(fc2_biases)
+    
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Args:
+            x: Pooled features (batch_size, in_features)
+            
+        Returns:
+            Severity logits (batch_size, num_conditions, num_classes)
+        """
+        hidden = F.relu_(self.fc1(x))
+        hidden = hidden.view(x.size(0), self.num_conditions, self.hidden_dim)
+        hidden = F.dropout(hidden, self.dropout_rate, self.training)
+        return torch.einsum('bch,chk->bck', hidden, self.weight) + self.bias
+
+
 class MultiLabelSkinClassifier(nn.Module):
     """
     Multi-label skin condition classifier with severity prediction
@@ -58,43 +188,61 @@ class MultiLabelSkinClassifier(nn.Module):
         self.backbone_name = backbone_name
         self.num_conditions = num_conditions
         self.num_severity_levels = num_severity_levels
+        self.grad_checkpointing = False
         
         # Load pre-trained backbone
         self.backbone = timm.create_model(
             backbone_name, 
             pretrained=pretrained,
-            num_classes=0  # Remove classifier head
+            num_classes=0,  # Remove classifier head
+            global_pool='avg'  # Backbone returns pooled features directly
         )
         
         # Get feature dimension from backbone
         self.feature_dim = self.backbone.num_features
         
-        # Global average pooling
-        self.global_pool = nn.AdaptiveAvgPool2d(1)
-        
         # Classification head for condition detection
-        self.classification_head = nn.Sequential(
-            nn.Dropout(dropout_rate),
-            nn.Linear(self.feature_dim, 512),
-            nn.ReLU(inplace=True),
-            nn.Dropout(dropout_rate),
-            nn.Linear(512, num_conditions),
-            nn.Sigmoid()  # Multi-label classification
+        self.classification_head = ClassificationHead(
+            self.feature_dim,
+            512,
+            num_conditions,  # Logits; sigmoid is fused into the loss
+            dropout_rate=dropout_rate
         )
         
         # Severity prediction head (for each condition)
-        self.severity_head = nn.ModuleList([
-            nn.Sequential(
-                nn.Dropout(dropout_rate),
-                nn.Linear(self.feature_dim, 256),
-                nn.ReLU(inplace=True),
-                nn.Dropout(dropout_rate),
-                nn.Linear(256, num_severity_levels + 1)  # +1 for "no condition"
-            ) for _ in range(num_conditions)
-        ])
+        self.severity_head = GroupedSeverityHead(
+            self.feature_dim,
+            num_conditions,
+            num_severity_levels + 1,  # +1 for "no condition"
+            hidden_dim=256,
+            dropout_rate=dropout_rate
+        )
         
         # Initialize weights
         self._initialize_weights()
+        
+        # NHWC lets cuDNN/oneDNN pick their fastest conv kernels without
+        # inserting layout conversions around every conv
+        self.backbone = self.backbone.to(memory_format=torch.channels_last)
+    
+    def set_grad_checkpointing(self, enable: bool = True):
+        """
+        Recompute backbone stage activations in the backward pass instead of
+        storing them, trading extra compute for activation memory. Uses timm's
+        per-stage checkpointing and only takes effect in training mode.
+        """
+        if not hasattr(self.backbone, 'set_grad_checkpointing'):
+            print(f"⚠️  {self.backbone_name} does not support gradient checkpointing")
+            return
+        self.grad_checkpointing = enable
+        self.backbone.set_grad_checkpointing(enable and self.training)
+    
+    def train(self, mode: bool = True):
+        """Switch train/eval mode; checkpointing is skipped in eval, where nothing is stored"""
+        super().train(mode)
+        if self.grad_checkpointing:
+            self.backbone.set_grad_checkpointing(mode)
+        return self
     
     def _initialize_weights(self):
         """Initialize weights for custom heads"""
@@ -103,6 +251,9 @@ class MultiLabelSkinClassifier(nn.Module):
                 nn.init.xavier_uniform_(m.weight)
                 if m.bias is not None:
                     nn.init.constant_(m.bias, 0)
+        
+        # The fused severity layers are initialized per condition block
+        self.severity_head.reset_parameters()
     
     def forward(self, x: torch.Tensor) -> Dict[str, torch.Tensor]:
         """
@@ -114,32 +265,56 @@ class MultiLabelSkinClassifier(nn.Module):
         Returns:
             Dictionary containing:
             - condition_logits: Binary classification logits for each condition
+              (apply torch.sigmoid for probabilities)
             - severity_logits: Severity classification logits for each condition
             - features: Extracted features from backbone
         """
-        # Extract features using backbone
-        features = self.backbone.forward_features(x)
-        
-        # Global average pooling
-        pooled_features = self.global_pool(features)
-        pooled_features = pooled_features.view(pooled_features.size(0), -1)
-        
-        # Condition classification
-        condition_logits = self.classification_head(pooled_features)
-        
-        # Severity prediction for each condition
-        severity_logits = []
-        for i in range(self.num_conditions):
-            severity_logit = self.severity_head[i](pooled_features)
-            severity_logits.append(severity_logit)
-        
-        severity_logits = torch.stack(severity_logits, dim=1)  # (batch, num_conditions, num_severity_levels+1)
+        condition_logits, severity_logits, pooled_features = self._forward_tensors(x)
         
         return {
             'condition_logits': condition_logits,
             'severity_logits': severity_logits,
             'features': pooled_features
         }
+    
+    def _forward_tensors(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Tuple-returning forward pass used by forward() and by export.py,
+        since TorchScript/ONNX runtimes don't all accept dict outputs
+        
+        Returns:
+            (condition_logits, severity_logits, features)
+        """
+        # Convert once at the input boundary to match the channels-last backbone
+        x = _to_channels_last(x)
+        
+        # Extract pooled features using backbone
+        pooled_features = self.backbone(x)
+        
+        # Fall back to a mean over H x W for backbones that still return a feature map
+        pooled_features = _flatten_pooled(pooled_features)
+        
+        # Condition classification
+        condition_logits = self.classification_head(pooled_features)
+        
+        # Severity prediction for all conditions at once
+        severity_logits = self.severity_head(pooled_features)  # (batch, num_conditions, num_severity_levels+1)
+        
+        return condition_logits, severity_logits, pooled_features
+
+
+@torch.jit.script
+def _focal_loss_terms(inputs: torch.Tensor, targets: torch.Tensor, alpha: float, gamma: float) -> torch.Tensor:
+    """Elementwise focal loss, scripted so the JIT fuser can emit one kernel on GPU"""
+    # Compute in FP32 under autocast; scripted code doesn't get autocast's promotion
+    inputs = inputs.float()
+    targets = targets.float()
+    
+    # The logits form fuses sigmoid + log and stays finite for saturated inputs
+    bce_loss = F.binary_cross_entropy_with_logits(inputs, targets, reduction='none')
+    p = torch.sigmoid(inputs)
+    pt = p * targets + (1 - p) * (1 - targets)
+    return alpha * (1 - pt).pow(gamma) * bce_loss
 
 
 class FocalLoss(nn.Module):
@@ -156,12 +331,10 @@ class FocalLoss(nn.Module):
     def forward(self, inputs: torch.Tensor, targets: torch.Tensor) -> torch.Tensor:
         """
         Args:
-            inputs: Predicted probabilities (batch_size, num_classes)
+            inputs: Predicted logits (batch_size, num_classes)
             targets: Ground truth labels (batch_size, num_classes)
         """
-        bce_loss = F.binary_cross_entropy(inputs, targets, reduction='none')
-        pt = torch.exp(-bce_loss)
-        focal_loss = self.alpha * (1 - pt) ** self.gamma * bce_loss
+        focal_loss = _focal_loss_terms(inputs, targets, self.alpha, self.gamma)
         
         if self.reduction == 'mean':
             return focal_loss.mean()
@@ -188,9 +361,11 @@ class CombinedLoss(nn.Module):
         if use_focal_loss:
             self.condition_loss = FocalLoss(alpha=1.0, gamma=2.0)
         else:
-            self.condition_loss = nn.BCELoss()
+            self.condition_loss = nn.BCEWithLogitsLoss()
         
-        self.severity_loss = nn.CrossEntropyLoss(ignore_index=-1)
+        # Summed and divided by the valid count in forward(): the default mean
+        # reduction returns NaN when every target in the batch is ignored
+        self.severity_loss = nn.CrossEntropyLoss(ignore_index=-1, reduction='sum')
     
     def forward(self, 
                 condition_logits: torch.Tensor, 
@@ -201,7 +376,7 @@ class CombinedLoss(nn.Module):
         Compute combined loss
         
         Args:
-            condition_logits: Predicted condition probabilities (batch, num_conditions)
+            condition_logits: Predicted condition logits (batch, num_conditions)
             severity_logits: Predicted severity logits (batch, num_conditions, num_severity_levels+1)
             condition_targets: Ground truth condition labels (batch, num_conditions)
             severity_targets: Ground truth severity labels (batch, num_conditions)
@@ -213,18 +388,14 @@ class CombinedLoss(nn.Module):
         batch_size, num_conditions, num_severity_levels = severity_logits.shape
         
         # Reshape for cross-entropy loss
-        severity_logits_flat = severity_logits.view(-1, num_severity_levels)
-        severity_targets_flat = severity_targets.view(-1)
-        
-        # Only compute loss for valid severity targets (not -1)
-        valid_mask = severity_targets_flat >= 0
-        if valid_mask.sum() > 0:
-            severity_loss = self.severity_loss(
-                severity_logits_flat[valid_mask], 
-                severity_targets_flat[valid_mask]
-            )
-        else:
-            severity_loss = torch.tensor(0.0, device=condition_logits.device)
+        # reshape: the grouped severity head's einsum output is not contiguous
+        severity_logits_flat = severity_logits.reshape(-1, num_severity_levels)
+        severity_targets_flat = severity_targets.reshape(-1)
+        
+        # ignore_index skips -1 targets without a boolean gather or host sync;
+        # averaging over the valid count gives 0 when there are none
+        num_valid = (severity_targets_flat >= 0).sum().clamp_min(1)
+        severity_loss = self.severity_loss(severity_logits_flat, severity_targets_flat) / num_valid
         
         # Combined loss
         total_loss = (self.condition_weight * condition_loss + 
@@ -242,8 +413,12 @@ class ModelMetrics:
     Calculate metrics for multi-label classification
     """
     
-    def __init__(self, num_conditions: int = 7, condition_names: Optional[List[str]] = None):
+    def __init__(self,
+                 num_conditions: int = 7,
+                 condition_names: Optional[List[str]] = None,
+                 device: torch.device = torch.device('cpu')):
         self.num_conditions = num_conditions
+        self.device = torch.device(device)
         self.condition_names = condition_names or [
             'acne', 'aging', 'fine_lines_wrinkles', 'hyperpigmentation',
             'pore_size', 'redness', 'textured_skin'
@@ -254,10 +429,13 @@ class ModelMetrics:
     
     def reset(self):
         """Reset all metrics"""
-        self.predictions = []
-        self.targets = []
-        self.condition_predictions = []
-        self.condition_targets = []
+        # Running per-condition counts kept on the model's device, so update()
+        # never syncs with the host; constant memory regardless of epoch length
+        self.tp = torch.zeros(self.num_conditions, device=self.device)
+        self.fp = torch.zeros(self.num_conditions, device=self.device)
+        self.fn = torch.zeros(self.num_conditions, device=self.device)
+        self.correct = torch.zeros(self.num_conditions, device=self.device)
+        self.total = 0
     
     def update(self, 
                condition_logits: torch.Tensor, 
@@ -265,87 +443,204 @@ class ModelMetrics:
                condition_targets: torch.Tensor,
                severity_targets: torch.Tensor):
         """Update metrics with batch predictions"""
-        # Store predictions and targets
-        self.predictions.append(condition_logits.detach().cpu())
-        self.targets.append(condition_targets.detach().cpu())
-        
-        # Store condition-specific predictions
-        condition_preds = (condition_logits > 0.5).float()
-        self.condition_predictions.append(condition_preds.detach().cpu())
-        self.condition_targets.append(condition_targets.detach().cpu())
+        condition_preds = (torch.sigmoid(condition_logits.detach()) > 0.5).float()
+        condition_targets = condition_targets.detach().float()
+        
+        # Accumulate TP/FP/FN for all conditions in one reduction each
+        self.tp += (condition_preds * condition_targets).sum(dim=0)
+        self.fp += (condition_preds * (1 - condition_targets)).sum(dim=0)
+        self.fn += ((1 - condition_preds) * condition_targets).sum(dim=0)
+        self.correct += (condition_preds == condition_targets).sum(dim=0)
+        self.total += condition_targets.numel()
     
     def compute_metrics(self) -> Dict[str, float]:
         """Compute final metrics"""
-        if not self.predictions:
+        if self.total == 0:
             return {}
         
-        # Concatenate all predictions and targets
-        all_preds = torch.cat(self.predictions, dim=0)
-        all_targets = torch.cat(self.targets, dim=0)
-        all_condition_preds = torch.cat(self.condition_predictions, dim=0)
-        all_condition_targets = torch.cat(self.condition_targets, dim=0)
+        # Single device-to-host copy of the accumulated counts
+        tp, fp, fn, correct = torch.stack([self.tp, self.fp, self.fn, self.correct]).cpu()
+        
+        # Precision, Recall, F1 for all conditions at once
+        precision = tp / (tp + fp).clamp_min(1)
+        recall = tp / (tp + fn).clamp_min(1)
+        f1 = 2 * precision * recall / (precision + recall).clamp_min(1e-12)
         
         metrics = {}
         
         # Overall metrics
-        metrics['accuracy'] = (all_condition_preds == all_condition_targets).float().mean().item()
+        metrics['accuracy'] = correct.sum().item() / self.total
         
-        # Per-condition metrics
-        for i, condition in enumerate(self.condition_names):
-            condition_pred = all_condition_preds[:, i]
-            condition_target = all_condition_targets[:, i]
-            
-            # Precision, Recall, F1
-            tp = (condition_pred * condition_target).sum().item()
-            fp = (condition_pred * (1 - condition_target)).sum().item()
-            fn = ((1 - condition_pred) * condition_target).sum().item()
-            
-            precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-            recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-            f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
-            
-            metrics[f'{condition}_precision'] = precision
-            metrics[f'{condition}_recall'] = recall
-            metrics[f'{condition}_f1'] = f1
+        # Plain floats keep checkpoints loadable with torch.load(weights_only=True)
+        for condition, p, r, f in zip(self.condition_names, precision.tolist(),
+                                      recall.tolist(), f1.tolist()):
+            metrics[f'{condition}_precision'] = p
+            metrics[f'{condition}_recall'] = r
+            metrics[f'{condition}_f1'] = f
         
         # Macro averages
-        precisions = [metrics[f'{condition}_precision'] for condition in self.condition_names]
-        recalls = [metrics[f'{condition}_recall'] for condition in self.condition_names]
-        f1_scores = [metrics[f'{condition}_f1'] for condition in self.condition_names]
-        
-        metrics['macro_precision'] = np.mean(precisions)
-        metrics['macro_recall'] = np.mean(recalls)
-        metrics['macro_f1'] = np.mean(f1_scores)
+        metrics['macro_precision'] = precision.mean().item()
+        metrics['macro_recall'] = recall.mean().item()
+        metrics['macro_f1'] = f1.mean().item()
         
         return metrics
 
 
+def compile_model(model: nn.Module, mode: str = 'reduce-overhead') -> nn.Module:
+    """Wrap a model with torch.compile when running on CUDA with PyTorch 2.x.
+    Returns the model unchanged on CPU or older PyTorch versions.
+    """
+    if not hasattr(torch, 'compile') or not torch.cuda.is_available():
+        return model
+    return torch.compile(model, mode=mode, fullgraph=False)
+
+
+def unwrap_model(model: nn.Module) -> nn.Module:
+    """Return the original module behind torch.compile and DDP wrappers"""
+    while True:
+        if hasattr(model, '_orig_mod'):
+            model = model._orig_mod
+        elif isinstance(model, nn.parallel.DistributedDataParallel):
+            model = model.module
+        else:
+            return model
+
+
+def resolve_amp_dtype(amp_dtype: Optional[str] = 'auto') -> Optional[torch.dtype]:
+    """Map an amp_dtype setting ('auto', 'bf16', 'fp16', 'none') to a torch dtype.
+    'auto' picks bfloat16 on Ampere or newer GPUs and float16 otherwise.
+    Returns None (full FP32) when AMP is disabled or CUDA is unavailable.
+    """
+    if amp_dtype in (None, 'none') or not torch.cuda.is_available():
+        return None
+    if amp_dtype == 'auto':
+        # Newer PyTorch reports bf16 as supported on pre-Ampere GPUs through slow
+        # emulation, so also require native bf16 Tensor Cores (compute capability 8.0+)
+        native_bf16 = torch.cuda.get_device_capability()[0] >= 8 and torch.cuda.is_bf16_supported()
+        return torch.bfloat16 if native_bf16 else torch.float16
+    dtypes = {'bf16': torch.bfloat16, 'fp16': torch.float16}
+    if amp_dtype not in dtypes:
+        raise ValueError(f"Unknown amp_dtype: {amp_dtype}")
+    return dtypes[amp_dtype]
+
+
+def _make_severity_targets(condition_targets: torch.Tensor,
+                           max_severity: int,
+                           device: Optional[torch.device] = None) -> torch.Tensor:
+    """
+    Random severity targets matching CombinedLoss's ignore_index=-1 contract:
+    a level in [0, max_severity) where a condition is present, -1 elsewhere
+    """
+    device = device or condition_targets.device
+    condition_targets = condition_targets.to(device)
+    return torch.where(
+        condition_targets.bool(),
+        torch.randint(0, max_severity, condition_targets.shape, device=device),
+        torch.full_like(condition_targets, -1, dtype=torch.long)
+    )
+
+
+# Backbone for CPU/edge deployment: far fewer FLOPs than resnet50 and
+# friendly to int8 quantization (no squeeze-excite or swish)
+DEPLOYMENT_MODEL_NAME = 'efficientnet_lite0'
+
+
+def quantize_int8(model: nn.Module,
+                  calib_loader,
+                  num_calibration_batches: int = 100,
+                  backend: str = 'fbgemm') -> nn.Module:
+    """
+    Post-training static int8 quantization with FX graph mode
+    
+    Calibrates activation ranges on batches from calib_loader (dicts with an
+    'image' key, as produced by SkinDataLoader) and returns the converted
+    GraphModule, which runs on CPU. The input model is left untouched.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+    
+    model = copy.deepcopy(unwrap_model(model)).cpu().eval()
+    example = next(iter(calib_loader))['image'][:1]
+    prepared = prepare_fx(model, get_default_qconfig_mapping(backend), (example,))
+    
+    with torch.no_grad():
+        for batch_idx, batch in enumerate(calib_loader):
+            if batch_idx >= num_calibration_batches:
+                break
+            prepared(batch['image'])
+    
+    return convert_fx(prepared)
+
+
 def create_model(model_name: str = 'resnet50', 
                 num_conditions: int = 7,
                 num_severity_levels: int = 6,
-                pretrained: bool = True) -> MultiLabelSkinClassifier:
+                pretrained: bool = True,
+                compile: bool = False) -> MultiLabelSkinClassifier:
     """Factory function to create model"""
     normalized_name = _normalize_timm_model_name(model_name)
-    return MultiLabelSkinClassifier(
+    model = MultiLabelSkinClassifier(
         backbone_name=normalized_name,
         num_conditions=num_conditions,
         num_severity_levels=num_severity_levels,
         pretrained=pretrained
     )
+    return compile_model(model) if compile else model
+
+
+def _allow_numpy_scalars():
+    """Allowlist numpy scalars for weights_only loading
+    
+    Checkpoints written before metrics were stored as plain floats hold numpy
+    scalars in their metric histories. Only the scalar constructor and the
+    matching dtypes are allowed; anything else still fails to load.
+    PyTorch < 2.4 has no allowlist, so such checkpoints must be re-saved there.
+    """
+    if not hasattr(torch.serialization, 'add_safe_globals'):
+        return
+    scalar_types = (np.float16, np.float32, np.float64, np.int32, np.int64, np.bool_)
+    torch.serialization.add_safe_globals([
+        np.float64(0).__reduce__()[0],  # numpy.core.multiarray.scalar
+        np.dtype,
+        *(type(np.dtype(scalar_type)) for scalar_type in scalar_types)
+    ])
+
+
+def load_checkpoint_model(checkpoint_path: str,
+                          device: str = 'cpu',
+                          strict: bool = True) -> MultiLabelSkinClassifier:
+    """Build the model named in a training checkpoint's config and load its weights (eval mode)"""
+    # mmap the tensor storages and refuse arbitrary pickled objects; there is
+    # deliberately no fallback to full unpickling for untrusted files
+    _allow_numpy_scalars()
+    checkpoint = torch.load(checkpoint_path, map_location=device, mmap=True, weights_only=True)
+    # Get model name from checkpoint config, default to efficientnet-b0
+    model_name = checkpoint.get('config', {}).get('model_name', 'efficientnet-b0')
+    print(f"Loading model: {model_name}")
+    model = create_model(model_name, pretrained=False)
+    model.load_state_dict(checkpoint['model_state_dict'], strict=strict)
+    model.eval()
+    model.to(device)
+    return model
 
 
 if __name__ == "__main__":
     # Test model architecture
     print("Testing Model Architecture...")
     
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    amp_dtype = resolve_amp_dtype('auto') or torch.bfloat16
+    
     # Create model
-    model = create_model('resnet50')
+    model = create_model('resnet50').to(device)
     
     # Test forward pass
     batch_size = 4
-    test_input = torch.randn(batch_size, 3, 224, 224)
+    test_input = torch.randn(batch_size, 3, 224, 224, device=device)
     
-    with torch.no_grad():
+    # inference_mode also skips version counter and view tracking; use it for every
+    # evaluation path and .clone() anything that must feed back into training
+    with torch.inference_mode(), torch.autocast(device_type=device, dtype=amp_dtype):
         outputs = model(test_input)
     
     print(f"Input shape: {test_input.shape}")
@@ -355,18 +650,23 @@ if __name__ == "__main__":
     
     # Test loss function
     criterion = CombinedLoss()
-    condition_targets = torch.randint(0, 2, (batch_size, 7)).float()
-    severity_targets = torch.randint(-1, 6, (batch_size, 7))
-    
-    loss_dict = criterion(
-        outputs['condition_logits'],
-        outputs['severity_logits'],
-        condition_targets,
-        severity_targets
-    )
+    condition_targets = torch.randint(0, 2, (batch_size, 7), device=device).float()
+    severity_targets = _make_severity_targets(condition_targets, 6, device)
+    
+    with torch.autocast(device_type=device, dtype=amp_dtype):
+        loss_dict = criterion(
+            outputs['condition_logits'],
+            outputs['severity_logits'],
+            condition_targets,
+            severity_targets
+        )
+    
+    # One device-to-host copy for all components instead of a sync per .item();
+    # training loops that log these every step should batch them the same way
+    loss_values = torch.stack([value.detach().float() for value in loss_dict.values()]).cpu().tolist()
     
     print(f"\nLoss components:")
-    for key, value in loss_dict.items():
-        print(f"  {key}: {value.item():.4f}")
+    for key, value in zip(loss_dict, loss_values):
+        print(f"  {key}: {value:.4f}")
     
     print("Model architecture test completed successfully!")
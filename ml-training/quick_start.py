@@ -5,9 +5,94 @@ This script provides an easy way to start training with sensible defaults
 
 import os
 import sys
+import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
 from train import SkinConditionTrainer
+from model_architecture import unwrap_model, quantize_int8, DEPLOYMENT_MODEL_NAME
+
+
+def _count_pngs(path: str, limit: int) -> int:
+    """Count .png files under path with os.scandir, stopping at limit"""
+    count = 0
+    stack = [path]
+    while stack and count < limit:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith('.png'):
+                    count += 1
+                    if count >= limit:
+                        break
+    return count
+
+
+def count_images(data_path: str, max_scan: int = 10_000):
+    """Count dataset images, scanning top-level subdirectories in parallel.
+    The count is informational, so it stops at max_scan.
+    Returns (count, capped).
+    """
+    with os.scandir(data_path) as entries:
+        entries = list(entries)
+    subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+    count = sum(1 for entry in entries if entry.is_file() and entry.name.endswith('.png'))
+    
+    if subdirs:
+        # Listing directories is bound by IOPS, not CPU, so threads overlap the waits
+        with ThreadPoolExecutor(max_workers=min(8, len(subdirs))) as pool:
+            count += sum(pool.map(lambda subdir: _count_pngs(subdir, max_scan), subdirs))
+    
+    return min(count, max_scan), count >= max_scan
+
+
+# Image count from the last check, reused while the dataset is unchanged
+DATASET_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.dataset_cache.json')
+
+
+def _dataset_mtime(data_path: str) -> float:
+    """Latest mtime of the dataset root, its condition directories and their
+    severity directories (which hold the images). Adding or removing an image
+    bumps its directory's mtime, so this catches changes without stat-ing
+    every file.
+    """
+    mtime = os.stat(data_path).st_mtime
+    with os.scandir(data_path) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            mtime = max(mtime, entry.stat(follow_symlinks=False).st_mtime)
+            with os.scandir(entry.path) as subentries:
+                for subentry in subentries:
+                    if subentry.is_dir(follow_symlinks=False):
+                        mtime = max(mtime, subentry.stat(follow_symlinks=False).st_mtime)
+    return mtime
+
+
+def cached_image_count(data_path: str, max_scan: int = 10_000):
+    """count_images() with results cached in .dataset_cache.json until the dataset changes"""
+    key = {'data_path': data_path, 'mtime': _dataset_mtime(data_path), 'max_scan': max_scan}
+    
+    try:
+        with open(DATASET_CACHE_PATH) as f:
+            cache = json.load(f)
+        if all(cache.get(name) == value for name, value in key.items()):
+            return cache['count'], cache['capped']
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    image_count, capped = count_images(data_path, max_scan)
+    
+    try:
+        with open(DATASET_CACHE_PATH, 'w') as f:
+            json.dump({**key, 'count': image_count, 'capped': capped}, f)
+    except OSError:
+        pass  # The count is informational; a read-only checkout just rescans next time
+    
+    return image_count, capped
 
 
 def check_environment():
@@ -31,6 +116,9 @@ def check_environment():
             print(f"✅ CUDA available: {torch.cuda.get_device_name(0)}")
             print(f"   CUDA version: {torch.version.cuda}")
             print(f"   GPU memory: {torch.cuda.get_device_properties(0).total_memory / 1e9:.1f} GB")
+            print(f"   BF16 supported: {torch.cuda.is_bf16_supported()}")
+            # Input shapes are fixed, so let cuDNN benchmark and cache the fastest conv algorithms
+            torch.backends.cudnn.benchmark = True
         else:
             print("⚠️  CUDA not available, will use CPU")
     except ImportError:
@@ -54,10 +142,8 @@ def check_environment():
         print(f"✅ Synthetic dataset found at {data_path}")
         
         # Count images
-        image_count = 0
-        for root, dirs, files in os.walk(data_path):
-            image_count += len([f for f in files if f.endswith('.png')])
-        print(f"   Found {image_count} images")
+        image_count, capped = cached_image_count(data_path)
+        print(f"   Found {image_count}{'+' if capped else ''} images")
     else:
         print(f"❌ Synthetic dataset not found at {data_path}")
         return False
@@ -78,13 +164,24 @@ def run_quick_training():
         'num_epochs': 5,   # Just 5 epochs for quick test
         'image_size': 224,
         'device': 'auto',
-        'use_wandb': False
+        'use_wandb': False,
+        'amp_dtype': 'auto',  # bf16 on Ampere+, fp16 + GradScaler otherwise
+        'compile': True,  # torch.compile on CUDA; skipped on CPU / PyTorch < 2.0
+        # DataLoader tuning: pinned buffers for async host-to-device copies,
+        # workers kept alive across epochs and prefetching ahead of training
+        'num_workers': min(8, os.cpu_count() or 1),
+        'pin_memory': torch.cuda.is_available(),
+        'persistent_workers': True,
+        'prefetch_factor': 4
     }
     
     print("Configuration:")
     for key, value in config.items():
         print(f"  {key}: {value}")
     
+    # Cap intra-op threads so they don't oversubscribe the cores alongside loader workers
+    torch.set_num_threads(min(8, os.cpu_count() or 1))
+    
     # Create trainer
     trainer = SkinConditionTrainer(**config)
     
@@ -98,7 +195,25 @@ def run_quick_training():
     print("Check 'training_history.png' for training plots")
 
 
-def run_full_training():
+def _ddp_worker(rank: int, world_size: int, config: dict):
+    """Per-GPU training process started by torch.multiprocessing.spawn"""
+    os.environ.setdefault('MASTER_ADDR', 'localhost')
+    os.environ.setdefault('MASTER_PORT', '29500')
+    torch.cuda.set_device(rank)
+    torch.set_num_threads(max(1, min(8, os.cpu_count() or 1) // world_size))
+    dist.init_process_group('nccl', rank=rank, world_size=world_size)
+    
+    try:
+        # The trainer detects the process group, shards the training set and wraps the model in DDP
+        trainer = SkinConditionTrainer(**{**config, 'device': f'cuda:{rank}'})
+        trainer.setup_data()
+        trainer.setup_model()
+        trainer.train()
+    finally:
+        dist.destroy_process_group()
+
+
+def run_full_training(distributed: bool = False):
     """Run full training with production settings"""
     print("\n🔥 Starting Full Training Session...")
     print("=" * 50)
@@ -112,20 +227,40 @@ def run_full_training():
         'image_size': 224,
         'device': 'auto',
         'use_wandb': False,  # Set to True if you want to use Weights & Biases
-        'experiment_name': 'skin_classifier_full_training'
+        'experiment_name': 'skin_classifier_full_training',
+        'amp_dtype': 'auto',  # bf16 on Ampere+, fp16 + GradScaler otherwise
+        'compile': True,  # torch.compile on CUDA; skipped on CPU / PyTorch < 2.0
+        # DataLoader tuning: pinned buffers for async host-to-device copies,
+        # workers kept alive across epochs and prefetching ahead of training
+        'num_workers': min(8, os.cpu_count() or 1),
+        'pin_memory': torch.cuda.is_available(),
+        'persistent_workers': True,
+        'prefetch_factor': 4
     }
     
     print("Configuration:")
     for key, value in config.items():
         print(f"  {key}: {value}")
     
-    # Create trainer
-    trainer = SkinConditionTrainer(**config)
-    
-    # Setup and train
-    trainer.setup_data()
-    trainer.setup_model()
-    trainer.train()
+    world_size = int(os.environ.get('WORLD_SIZE', torch.cuda.device_count()))
+    if distributed and world_size > 1:
+        # One process per GPU; batch_size is per GPU
+        print(f"Launching DistributedDataParallel on {world_size} GPUs")
+        mp.spawn(_ddp_worker, args=(world_size, config), nprocs=world_size)
+    else:
+        if distributed:
+            print("⚠️  Fewer than 2 GPUs available, training on a single device")
+        
+        # Cap intra-op threads so they don't oversubscribe the cores alongside loader workers
+        torch.set_num_threads(min(8, os.cpu_count() or 1))
+        
+        # Create trainer
+        trainer = SkinConditionTrainer(**config)
+        
+        # Setup and train
+        trainer.setup_data()
+        trainer.setup_model()
+        trainer.train()
     
     print("\n✅ Full training completed!")
     print("Check the 'checkpoints' directory for saved models")
@@ -138,18 +273,92 @@ def run_evaluation():
     print("=" * 50)
     
     # This would load the best model and evaluate on test set
-    # Implementation would go here
+    # Implementation would go here, with the forward passes wrapped in torch.inference_mode()
     print("Evaluation functionality coming soon!")
     print("For now, you can use the trained model for inference")
 
 
+def run_export():
+    """Export the best checkpoint to TorchScript and ONNX"""
+    print("\n📦 Exporting Model for Inference...")
+    print("=" * 50)
+    
+    from export import export_model
+    
+    checkpoint_path = os.path.join('checkpoints', 'best_model.pth')
+    if not os.path.exists(checkpoint_path):
+        print(f"❌ No checkpoint found at {checkpoint_path}. Train a model first.")
+        return
+    
+    export_model(checkpoint_path, output_dir='exports', export_format='all')
+    
+    print("\n✅ Export completed!")
+    print("Check the 'exports' directory for model.pt and model.onnx")
+    print("Build a TensorRT engine with: python export.py --format onnx --trt")
+
+
+def run_deployment():
+    """Train the lightweight deployment backbone and build its int8 model"""
+    print("\n📱 Building Deployment Model...")
+    print("=" * 50)
+    
+    # Production settings on the lite backbone
+    config = {
+        'model_name': DEPLOYMENT_MODEL_NAME,
+        'batch_size': 32,
+        'learning_rate': 1e-4,
+        'num_epochs': 100,
+        'image_size': 224,
+        'device': 'auto',
+        'use_wandb': False,
+        'experiment_name': 'skin_classifier_deployment',
+        'amp_dtype': 'auto',
+        'compile': True,
+        'num_workers': min(8, os.cpu_count() or 1),
+        'pin_memory': torch.cuda.is_available(),
+        'persistent_workers': True,
+        'prefetch_factor': 4
+    }
+    
+    print("Configuration:")
+    for key, value in config.items():
+        print(f"  {key}: {value}")
+    
+    torch.set_num_threads(min(8, os.cpu_count() or 1))
+    
+    trainer = SkinConditionTrainer(**config)
+    trainer.setup_data()
+    trainer.setup_model()
+    trainer.train()
+    
+    # Quantize the best weights, calibrating on the validation set
+    model = unwrap_model(trainer.model)
+    best_path = os.path.join('checkpoints', 'best_model.pth')
+    if os.path.exists(best_path):
+        checkpoint = torch.load(best_path, map_location=trainer.device, weights_only=True)
+        model.load_state_dict(checkpoint['model_state_dict'])
+    
+    print("\nQuantizing to int8...")
+    quantized = quantize_int8(model, trainer.val_loader)
+    example = torch.randn(1, 3, config['image_size'], config['image_size'])
+    int8_path = os.path.join('checkpoints', 'best_model_int8.pth')
+    torch.jit.save(torch.jit.trace(quantized, example, strict=False), int8_path)
+    
+    print("\n✅ Deployment model built!")
+    print(f"Saved int8 TorchScript model: {int8_path}")
+    print("inference_server.py serves it automatically on CPU")
+
+
 def main():
     parser = argparse.ArgumentParser(description='Quick Start for Skin Condition ML Training')
     parser.add_argument('--mode', type=str, default='check',
-                       choices=['check', 'quick', 'full', 'eval'],
-                       help='Mode to run: check environment, quick training, full training, or evaluation')
+                       choices=['check', 'quick', 'full', 'eval', 'export', 'deployment'],
+                       help='Mode to run: check environment, quick training, full training, evaluation, '
+                            'model export, or lite int8 deployment build')
     parser.add_argument('--gpu', action='store_true', help='Force GPU usage')
     parser.add_argument('--wandb', action='store_true', help='Enable Weights & Biases logging')
+    parser.add_argument('--distributed', action='store_true',
+                       help='Full training on all visible GPUs with DistributedDataParallel (WORLD_SIZE overrides the GPU count)')
     
     args = parser.parse_args()
     
@@ -184,11 +393,28 @@ def main():
             print("Training cancelled.")
             return
         
-        run_full_training()
+        run_full_training(distributed=args.distributed)
     
     elif args.mode == 'eval':
         run_evaluation()
     
+    elif args.mode == 'export':
+        run_export()
+    
+    elif args.mode == 'deployment':
+        if not check_environment():
+            print("\n❌ Environment check failed. Please fix the issues first.")
+            return
+        
+        # Confirm with user
+        print(f"\n⚠️  Deployment builds a full 100-epoch {DEPLOYMENT_MODEL_NAME} training run, then quantizes it to int8.")
+        response = input("Do you want to continue? (y/N): ")
+        if response.lower() != 'y':
+            print("Training cancelled.")
+            return
+        
+        run_deployment()
+    
     print("\n🎉 Done!")
 
 
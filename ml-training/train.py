@@ -6,12 +6,17 @@ Multi-label skin condition classification with severity prediction
 import os
 import json
 import time
+import contextlib
 import argparse
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel as DDP
 from torch.utils.data import DataLoader
 import torchvision.transforms as transforms
 from sklearn.metrics import classification_report, multilabel_confusion_matrix
@@ -22,15 +27,67 @@ import wandb
 from datetime import datetime
 
 # Import our custom modules
-from data_pipeline import SkinDataLoader, SkinConditionDataset
+from data_pipeline import SkinDataLoader, SkinConditionDataset, GPUAugment
 from model_architecture import (
     MultiLabelSkinClassifier, 
     CombinedLoss, 
     ModelMetrics,
-    create_model
+    create_model,
+    compile_model,
+    unwrap_model,
+    resolve_amp_dtype,
+    quantize_int8
 )
 
 
+class CUDAPrefetcher:
+    """
+    Wraps a DataLoader and copies the next batch to the GPU on a side stream
+    while the current batch is being computed on the default stream
+    """
+    
+    def __init__(self, loader: DataLoader, device: torch.device):
+        self.loader = loader
+        self.device = device
+        self.stream = torch.cuda.Stream(device=device)
+        self.next_batch = None
+    
+    def __len__(self):
+        return len(self.loader)
+    
+    def __iter__(self):
+        self.iterator = iter(self.loader)
+        self.preload()
+        
+        while self.next_batch is not None:
+            current_stream = torch.cuda.current_stream(self.device)
+            current_stream.wait_stream(self.stream)
+            batch = self.next_batch
+            
+            # The tensors were allocated on the copy stream; tell the caching
+            # allocator they are now in use on the compute stream
+            for value in batch.values():
+                if isinstance(value, torch.Tensor):
+                    value.record_stream(current_stream)
+            
+            self.preload()
+            yield batch
+    
+    def preload(self):
+        """Start the host-to-device copy of the next batch"""
+        try:
+            batch = next(self.iterator)
+        except StopIteration:
+            self.next_batch = None
+            return
+        
+        with torch.cuda.stream(self.stream):
+            self.next_batch = {
+                key: value.to(self.device, non_blocking=True) if isinstance(value, torch.Tensor) else value
+                for key, value in batch.items()
+            }
+
+
 class SkinConditionTrainer:
     """Main training class for skin condition classification"""
     
@@ -45,7 +102,19 @@ class SkinConditionTrainer:
                  experiment_name: Optional[str] = None,
                  pretrained: bool = False,
                  max_train_batches: Optional[int] = None,
-                 max_val_batches: Optional[int] = None):
+                 max_val_batches: Optional[int] = None,
+                 amp_dtype: Optional[str] = 'auto',
+                 num_workers: Optional[int] = None,
+                 pin_memory: Optional[bool] = None,
+                 persistent_workers: bool = True,
+                 prefetch_factor: int = 4,
+                 grad_checkpointing: bool = False,
+                 accum_steps: int = 1,
+                 compile: bool = False,
+                 gpu_augment: bool = False,
+                 cuda_graph: bool = False,
+                 quantize_eval: bool = False,
+                 checkpoint_every: int = 5):
         
         self.model_name = model_name
         self.batch_size = batch_size
@@ -56,6 +125,22 @@ class SkinConditionTrainer:
         self.pretrained = pretrained
         self.max_train_batches = max_train_batches
         self.max_val_batches = max_val_batches
+        self.num_workers = num_workers if num_workers is not None else min(8, os.cpu_count() or 1)
+        self.pin_memory = pin_memory
+        self.persistent_workers = persistent_workers
+        self.prefetch_factor = prefetch_factor
+        self.grad_checkpointing = grad_checkpointing
+        self.accum_steps = max(1, accum_steps)
+        self.compile = compile
+        self.gpu_augment = gpu_augment
+        
+        # Launched with torchrun: join the process group and take this process's GPU
+        if int(os.environ.get('WORLD_SIZE', 1)) > 1 and not (dist.is_available() and dist.is_initialized()):
+            local_rank = int(os.environ.get('LOCAL_RANK', 0))
+            if torch.cuda.is_available():
+                torch.cuda.set_device(local_rank)
+                device = f'cuda:{local_rank}'
+            dist.init_process_group('nccl' if torch.cuda.is_available() else 'gloo')
         
         # Set device
         if device == 'auto':
@@ -65,8 +150,46 @@ class SkinConditionTrainer:
         
         print(f"Using device: {self.device}")
         
+        # image_size is fixed, so let cuDNN autotune conv algorithms per shape;
+        # TF32 runs FP32 matmuls/convs on Ampere+ Tensor Cores
+        if self.device.type == 'cuda':
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+        
+        # Pinned host memory only pays off for copies to a GPU
+        if self.pin_memory is None:
+            self.pin_memory = self.device.type == 'cuda'
+        
+        # Distributed training: the process group comes from torchrun (above) or
+        # quick_start.py --distributed; only rank 0 logs and saves
+        self.distributed = dist.is_available() and dist.is_initialized()
+        self.rank = dist.get_rank() if self.distributed else 0
+        self.is_main_process = self.rank == 0
+        self.use_wandb = use_wandb and self.is_main_process
+        
+        # Mixed precision: bf16 needs no loss scaling, fp16 uses a GradScaler
+        self.amp_dtype = resolve_amp_dtype(amp_dtype) if self.device.type == 'cuda' else None
+        self.scaler = torch.cuda.amp.GradScaler(enabled=self.amp_dtype == torch.float16)
+        print(f"Mixed precision: {self.amp_dtype or 'disabled'}")
+        
+        # Whole-step CUDA graph: the captured step must be sync-free and single-process
+        if cuda_graph and (self.device.type != 'cuda' or self.distributed or self.accum_steps > 1
+                           or self.amp_dtype == torch.float16 or self.compile or self.grad_checkpointing):
+            print("CUDA graph step needs CUDA without DDP, gradient accumulation, fp16 loss scaling, "
+                  "--compile or gradient checkpointing; training eagerly")
+            cuda_graph = False
+        self.cuda_graph = cuda_graph
+        self.train_graph = None
+        self.graph_warmup_steps = 0
+        
+        # After training, also score an int8 copy of the best weights (see evaluate_int8)
+        self.quantize_eval = quantize_eval
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.int8_val_metrics = None
+        
         # Initialize experiment tracking
-        if use_wandb:
+        if self.use_wandb:
             self.experiment_name = experiment_name or f"skin_classifier_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             wandb.init(
                 project="shine-skin-collective",
@@ -77,7 +200,8 @@ class SkinConditionTrainer:
                     'learning_rate': learning_rate,
                     'num_epochs': num_epochs,
                     'image_size': image_size,
-                    'device': str(self.device)
+                    'device': str(self.device),
+                    'amp_dtype': str(self.amp_dtype)
                 }
             )
         
@@ -94,14 +218,19 @@ class SkinConditionTrainer:
         self.val_losses = []
         self.train_metrics = []
         self.val_metrics = []
+        self.lrs = []
         
-        # Best model tracking
+        # Best model tracking; the weights themselves live in checkpoints/best_model.pth
         self.best_val_f1 = 0.0
-        self.best_model_state = None
+        
+        # Checkpoints are written by a background thread so training doesn't wait on disk
+        self.checkpoint_executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_checkpoints = []
     
     def setup_model(self):
         """Initialize model, optimizer, scheduler, and loss function"""
-        print("Setting up model...")
+        if self.is_main_process:
+            print("Setting up model...")
         
         # Create model
         self.model = create_model(
@@ -111,12 +240,34 @@ class SkinConditionTrainer:
             pretrained=self.pretrained
         ).to(self.device)
         
+        if self.grad_checkpointing:
+            # Recompute activations per backbone stage to fit larger batches
+            self.model.set_grad_checkpointing(True)
+        
+        if self.distributed:
+            # Share BatchNorm statistics across GPUs; DDP all-reduces gradients
+            device_ids = None
+            if self.device.type == 'cuda':
+                self.model = nn.SyncBatchNorm.convert_sync_batchnorm(self.model)
+                device_ids = [self.device.index]
+            # Gradients are all-reduced in 25MB buckets, overlapping with backward
+            self.model = DDP(self.model, device_ids=device_ids, bucket_cap_mb=25)
+        
+        if self.compile and self.device.type == 'cuda':
+            # Fuse pointwise chains with Inductor; reduce-overhead adds CUDA graphs
+            # for the fixed input shape. Compiled after DDP so Dynamo can split the
+            # graph at gradient buckets. No-op on PyTorch < 2.0.
+            self.model = compile_model(self.model, mode='reduce-overhead')
+        
         # Initialize optimizer
-        self.optimizer = optim.AdamW(
-            self.model.parameters(),
-            lr=self.learning_rate,
-            weight_decay=1e-4
-        )
+        # Fused AdamW updates every parameter in one kernel on CUDA; PyTorch
+        # builds without it fall back to the multi-tensor (foreach) path
+        optimizer_kwargs = dict(lr=self.learning_rate, weight_decay=1e-4, capturable=self.cuda_graph)
+        try:
+            self.optimizer = optim.AdamW(self.model.parameters(), fused=self.device.type == 'cuda',
+                                         **optimizer_kwargs)
+        except (TypeError, RuntimeError):
+            self.optimizer = optim.AdamW(self.model.parameters(), foreach=True, **optimizer_kwargs)
         
         # Initialize scheduler
         self.scheduler = optim.lr_scheduler.CosineAnnealingLR(
@@ -133,9 +284,12 @@ class SkinConditionTrainer:
         )
         
         # Initialize metrics
-        self.metrics = ModelMetrics(num_conditions=7)
+        self.metrics = ModelMetrics(num_conditions=7, device=self.device)
         
-        print(f"Model setup complete. Total parameters: {sum(p.numel() for p in self.model.parameters()):,}")
+        # Counted once; DDP/compile wrappers share the same parameters
+        self.num_params = sum(p.numel() for p in self.model.parameters())
+        if self.is_main_process:
+            print(f"Model setup complete. Total parameters: {self.num_params:,}")
     
     def setup_data(self):
         """Setup data loaders"""
@@ -145,54 +299,133 @@ class SkinConditionTrainer:
             batch_size=self.batch_size,
             train_split=0.7,
             val_split=0.15,
-            image_size=self.image_size
+            image_size=self.image_size,
+            num_workers=self.num_workers,
+            pin_memory=self.pin_memory,
+            persistent_workers=self.persistent_workers,
+            prefetch_factor=self.prefetch_factor,
+            distributed=self.distributed,
+            gpu_augment=self.gpu_augment
         )
         
+        # Loaders yield uint8 images in this mode; flip/normalize them on the device
+        self.gpu_aug = GPUAugment().to(self.device) if self.gpu_augment else None
+        
         print(f"Data loaders created:")
         print(f"  Train: {len(self.train_loader)} batches")
         print(f"  Val: {len(self.val_loader)} batches")
         print(f"  Test: {len(self.test_loader)} batches")
     
+    def _train_step(self, images: torch.Tensor, condition_targets: torch.Tensor,
+                    severity_targets: torch.Tensor, sync_now: bool, group_size: int = 1,
+                    capturing: bool = False):
+        """Forward/backward on one micro-batch of a group_size accumulation group;
+        steps the optimizer when sync_now"""
+        # Under DDP, skip the gradient all-reduce on micro-batches that only accumulate
+        sync_context = self.model.no_sync() if self.distributed and not sync_now else contextlib.nullcontext()
+        
+        with sync_context:
+            # Forward pass under autocast (its weight-cast cache can't be used inside a graph capture)
+            with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype,
+                                enabled=self.amp_dtype is not None, cache_enabled=not capturing):
+                outputs = self.model(images)
+            
+            # Compute loss in FP32 for numerical stability
+            loss_dict = self.criterion(
+                outputs['condition_logits'].float(),
+                outputs['severity_logits'].float(),
+                condition_targets,
+                severity_targets
+            )
+            
+            # Backward pass; gradients of the group's micro-batches sum to their mean
+            self.scaler.scale(loss_dict['total_loss'] / group_size).backward()
+        
+        if sync_now:
+            # Gradient clipping (on unscaled gradients)
+            self.scaler.unscale_(self.optimizer)
+            torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
+            
+            self.scaler.step(self.optimizer)
+            self.scaler.update()
+            self.optimizer.zero_grad(set_to_none=True)
+        
+        return outputs, loss_dict
+    
+    def _capture_train_step(self, images: torch.Tensor, condition_targets: torch.Tensor,
+                            severity_targets: torch.Tensor):
+        """Record forward, loss, backward, clipping and the optimizer step as one CUDA graph
+        
+        Replaying it re-runs the whole step on whatever is copied into
+        self.static_batch, with results in self.static_outputs. The capturable
+        AdamW bakes in the current learning rate, so train_epoch re-captures
+        every epoch after the scheduler steps.
+        """
+        self.static_batch = (images.clone(), condition_targets.clone(), severity_targets.clone())
+        self.optimizer.zero_grad(set_to_none=True)
+        
+        self.train_graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(self.train_graph):
+            self.static_outputs = self._train_step(*self.static_batch, sync_now=True, capturing=True)
+    
     def train_epoch(self, epoch: int) -> Dict[str, float]:
         """Train for one epoch"""
         self.model.train()
+        if self.gpu_aug is not None:
+            self.gpu_aug.train()
         self.metrics.reset()
         
-        total_loss = 0.0
+        # Accumulate on device; .item() forces a GPU sync, so only read it back occasionally
+        total_loss = torch.zeros((), device=self.device)
         num_batches = len(self.train_loader)
         
-        pbar = tqdm(self.train_loader, desc=f"Epoch {epoch+1}/{self.num_epochs} [Train]")
+        # On GPU, prefetch the next batch's copy while the current one trains
+        loader = CUDAPrefetcher(self.train_loader, self.device) if self.device.type == 'cuda' else self.train_loader
+        pbar = tqdm(loader, desc=f"Epoch {epoch+1}/{self.num_epochs} [Train]",
+                    disable=not self.is_main_process, mininterval=1.0)
+        
+        # Batch losses for wandb stay on device and are flushed every 100 batches
+        wandb_buffer = []
+        
+        # The optimizer steps every accum_steps micro-batches and on the last one
+        last_batch_idx = min(num_batches, self.max_train_batches or num_batches) - 1
+        # ...so the final group may be shorter than accum_steps
+        tail_start = last_batch_idx - last_batch_idx % self.accum_steps
+        tail_size = last_batch_idx - tail_start + 1
+        self.optimizer.zero_grad(set_to_none=True)
+        self.train_graph = None
         
         for batch_idx, batch in enumerate(pbar):
-            # Move to device
-            images = batch['image'].to(self.device)
-            condition_targets = batch['condition_targets'].to(self.device)
-            severity_targets = batch['severity_targets'].to(self.device)
+            # Move to device (async from pinned memory; no-op after CUDAPrefetcher);
+            # images go channels-last (NHWC) to match the backbone
+            images = batch['image'].to(self.device, non_blocking=True, memory_format=torch.channels_last)
+            if self.gpu_aug is not None:
+                images = self.gpu_aug(images)
+            condition_targets = batch['condition_targets'].to(self.device, non_blocking=True)
+            severity_targets = batch['severity_targets'].to(self.device, non_blocking=True)
             
-            # Forward pass
-            outputs = self.model(images)
+            sync_now = (batch_idx + 1) % self.accum_steps == 0 or batch_idx == last_batch_idx
             
-            # Compute loss
-            loss_dict = self.criterion(
-                outputs['condition_logits'],
-                outputs['severity_logits'],
-                condition_targets,
-                severity_targets
-            )
+            # After a few eager warmup steps, replay full batches through the captured
+            # step; a short final batch falls back to the eager path
+            if (self.cuda_graph and self.graph_warmup_steps >= 3
+                    and images.size(0) == self.batch_size):
+                if self.train_graph is None:
+                    self._capture_train_step(images, condition_targets, severity_targets)
+                for static, tensor in zip(self.static_batch, (images, condition_targets, severity_targets)):
+                    static.copy_(tensor)
+                self.train_graph.replay()
+                outputs, loss_dict = self.static_outputs
+            else:
+                group_size = tail_size if batch_idx >= tail_start else self.accum_steps
+                outputs, loss_dict = self._train_step(images, condition_targets, severity_targets,
+                                                      sync_now, group_size)
+                self.graph_warmup_steps += 1
             
             loss = loss_dict['total_loss']
             
-            # Backward pass
-            self.optimizer.zero_grad()
-            loss.backward()
-            
-            # Gradient clipping
-            torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
-            
-            self.optimizer.step()
-            
             # Update metrics
-            total_loss += loss.item()
+            total_loss += loss.detach()
             self.metrics.update(
                 outputs['condition_logits'],
                 outputs['severity_logits'],
@@ -201,27 +434,30 @@ class SkinConditionTrainer:
             )
             
             # Update progress bar
-            pbar.set_postfix({
-                'Loss': f"{loss.item():.4f}",
-                'Avg Loss': f"{total_loss/(batch_idx+1):.4f}"
-            })
+            if batch_idx % 20 == 0:
+                pbar.set_postfix({
+                    'Loss': f"{loss.item():.4f}",
+                    'Avg Loss': f"{total_loss.item()/(batch_idx+1):.4f}"
+                })
             
-            # Log to wandb
+            # Log to wandb (stack copies the losses, which a CUDA graph replay would overwrite)
             if self.use_wandb and batch_idx % 10 == 0:
-                wandb.log({
-                    'train/batch_loss': loss.item(),
-                    'train/condition_loss': loss_dict['condition_loss'].item(),
-                    'train/severity_loss': loss_dict['severity_loss'].item(),
-                    'epoch': epoch,
-                    'batch': batch_idx
-                })
+                wandb_buffer.append((batch_idx, torch.stack([
+                    loss.detach(),
+                    loss_dict['condition_loss'].detach(),
+                    loss_dict['severity_loss'].detach()
+                ])))
+                if batch_idx % 100 == 0:
+                    self._flush_wandb_batches(epoch, wandb_buffer)
 
             # Optional fast pass limit
             if self.max_train_batches is not None and (batch_idx + 1) >= self.max_train_batches:
                 break
         
+        self._flush_wandb_batches(epoch, wandb_buffer)
+        
         # Compute epoch metrics
-        epoch_loss = total_loss / num_batches
+        epoch_loss = (total_loss / num_batches).item()
         epoch_metrics = self.metrics.compute_metrics()
         
         return {
@@ -229,36 +465,118 @@ class SkinConditionTrainer:
             **epoch_metrics
         }
     
+    def _flush_wandb_batches(self, epoch: int, buffer: List):
+        """Log buffered (batch_idx, losses) entries with one device-to-host copy, then clear the buffer"""
+        if not buffer:
+            return
+        values = torch.stack([losses for _, losses in buffer]).tolist()
+        for (batch_idx, _), (batch_loss, condition_loss, severity_loss) in zip(buffer, values):
+            wandb.log({
+                'train/batch_loss': batch_loss,
+                'train/condition_loss': condition_loss,
+                'train/severity_loss': severity_loss,
+                'epoch': epoch,
+                'batch': batch_idx
+            })
+        buffer.clear()
+    
+    def _cpu_val_batches(self):
+        """Yield validation batches as normalized CPU tensors for the int8 model"""
+        for batch_idx, batch in enumerate(self.val_loader):
+            if self.max_val_batches is not None and batch_idx >= self.max_val_batches:
+                break
+            images = batch['image']
+            if self.gpu_aug is not None:
+                images = self.gpu_aug(images)
+            yield {**batch, 'image': images.contiguous(memory_format=torch.channels_last)}
+    
+    def evaluate_int8(self, num_calibration_batches: int = 10) -> Dict[str, float]:
+        """Validate a post-training int8 copy of the best weights
+        
+        Run once after training: quantize_int8 is calibrated on validation
+        batches and the converted model runs on CPU. Best-model selection stays
+        on the fp32 scores; these are reported alongside them.
+        """
+        model = create_model(self.model_name, pretrained=False)
+        best_path = os.path.join('checkpoints', 'best_model.pth')
+        if os.path.exists(best_path):
+            checkpoint = torch.load(best_path, map_location='cpu', weights_only=True)
+            model.load_state_dict(checkpoint['model_state_dict'])
+        else:
+            model.load_state_dict(unwrap_model(self.model).state_dict())
+        
+        if self.gpu_aug is not None:
+            self.gpu_aug.eval()
+        with torch.inference_mode():
+            calib_batches = []
+            for batch in self._cpu_val_batches():
+                if len(calib_batches) >= num_calibration_batches:
+                    break
+                calib_batches.append({'image': batch['image']})
+        int8_model = quantize_int8(model, calib_batches, len(calib_batches))
+        
+        metrics = ModelMetrics(num_conditions=7)
+        total_loss, num_batches = 0.0, 0
+        with torch.inference_mode():
+            for batch in tqdm(self._cpu_val_batches(), desc="Int8 validation", total=len(self.val_loader)):
+                outputs = int8_model(batch['image'])
+                loss_dict = self.criterion(
+                    outputs['condition_logits'].float(),
+                    outputs['severity_logits'].float(),
+                    batch['condition_targets'],
+                    batch['severity_targets']
+                )
+                total_loss += loss_dict['total_loss'].item()
+                num_batches += 1
+                metrics.update(
+                    outputs['condition_logits'],
+                    outputs['severity_logits'],
+                    batch['condition_targets'],
+                    batch['severity_targets']
+                )
+        
+        return {'loss': total_loss / max(num_batches, 1), **metrics.compute_metrics()}
+    
     def validate_epoch(self, epoch: int) -> Dict[str, float]:
         """Validate for one epoch"""
         self.model.eval()
+        if self.gpu_aug is not None:
+            self.gpu_aug.eval()
         self.metrics.reset()
         
-        total_loss = 0.0
+        total_loss = torch.zeros((), device=self.device)
         num_batches = len(self.val_loader)
         
-        with torch.no_grad():
-            pbar = tqdm(self.val_loader, desc=f"Epoch {epoch+1}/{self.num_epochs} [Val]")
+        # inference_mode also skips autograd's version counter and view tracking
+        with torch.inference_mode():
+            loader = CUDAPrefetcher(self.val_loader, self.device) if self.device.type == 'cuda' else self.val_loader
+            pbar = tqdm(loader, desc=f"Epoch {epoch+1}/{self.num_epochs} [Val]",
+                        disable=not self.is_main_process, mininterval=1.0)
             
             for batch_idx, batch in enumerate(pbar):
-                # Move to device
-                images = batch['image'].to(self.device)
-                condition_targets = batch['condition_targets'].to(self.device)
-                severity_targets = batch['severity_targets'].to(self.device)
+                # Move to device (async from pinned memory; no-op after CUDAPrefetcher);
+                # images go channels-last (NHWC) to match the backbone
+                images = batch['image'].to(self.device, non_blocking=True, memory_format=torch.channels_last)
+                if self.gpu_aug is not None:
+                    images = self.gpu_aug(images)
+                condition_targets = batch['condition_targets'].to(self.device, non_blocking=True)
+                severity_targets = batch['severity_targets'].to(self.device, non_blocking=True)
                 
-                # Forward pass
-                outputs = self.model(images)
+                # Forward pass under autocast
+                with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype,
+                                    enabled=self.amp_dtype is not None):
+                    outputs = self.model(images)
                 
-                # Compute loss
+                # Compute loss in FP32 for numerical stability
                 loss_dict = self.criterion(
-                    outputs['condition_logits'],
-                    outputs['severity_logits'],
+                    outputs['condition_logits'].float(),
+                    outputs['severity_logits'].float(),
                     condition_targets,
                     severity_targets
                 )
                 
                 loss = loss_dict['total_loss']
-                total_loss += loss.item()
+                total_loss += loss
                 
                 # Update metrics
                 self.metrics.update(
@@ -269,17 +587,18 @@ class SkinConditionTrainer:
                 )
                 
                 # Update progress bar
-                pbar.set_postfix({
-                    'Loss': f"{loss.item():.4f}",
-                    'Avg Loss': f"{total_loss/(batch_idx+1):.4f}"
-                })
+                if batch_idx % 20 == 0:
+                    pbar.set_postfix({
+                        'Loss': f"{loss.item():.4f}",
+                        'Avg Loss': f"{total_loss.item()/(batch_idx+1):.4f}"
+                    })
 
                 # Optional fast pass limit
                 if self.max_val_batches is not None and (batch_idx + 1) >= self.max_val_batches:
                     break
         
         # Compute epoch metrics
-        epoch_loss = total_loss / num_batches
+        epoch_loss = (total_loss / num_batches).item()
         epoch_metrics = self.metrics.compute_metrics()
         
         return {
@@ -287,39 +606,79 @@ class SkinConditionTrainer:
             **epoch_metrics
         }
     
+    @staticmethod
+    def _snapshot(state):
+        """Copy all tensors in a (nested) state dict to CPU, detached from training"""
+        if isinstance(state, torch.Tensor):
+            return state.detach().to('cpu', copy=True)
+        if isinstance(state, dict):
+            return {key: SkinConditionTrainer._snapshot(value) for key, value in state.items()}
+        if isinstance(state, (list, tuple)):
+            return type(state)(SkinConditionTrainer._snapshot(value) for value in state)
+        return state
+    
     def save_checkpoint(self, epoch: int, is_best: bool = False):
-        """Save model checkpoint"""
+        """Save model checkpoint
+        
+        Always refreshes latest.pth, plus best_model.pth when is_best and an
+        epoch-numbered copy every 25 epochs. Weights and optimizer state are
+        snapshotted to CPU here; the checkpoint is serialized once in the
+        background and copied to the other paths (see wait_for_checkpoints).
+        """
         checkpoint_dir = "checkpoints"
         os.makedirs(checkpoint_dir, exist_ok=True)
         
+        # The previous epoch's writes have had a whole epoch to finish; waiting
+        # here keeps at most one CPU snapshot alive and surfaces write errors
+        self.wait_for_checkpoints()
+        
         checkpoint = {
             'epoch': epoch,
-            'model_state_dict': self.model.state_dict(),
-            'optimizer_state_dict': self.optimizer.state_dict(),
-            'scheduler_state_dict': self.scheduler.state_dict(),
-            'train_losses': self.train_losses,
-            'val_losses': self.val_losses,
-            'train_metrics': self.train_metrics,
-            'val_metrics': self.val_metrics,
+            # Save the uncompiled module so keys load into a plain model
+            'model_state_dict': self._snapshot(unwrap_model(self.model).state_dict()),
+            'optimizer_state_dict': self._snapshot(self.optimizer.state_dict()),
+            'scheduler_state_dict': self._snapshot(self.scheduler.state_dict()),
+            # History lists keep growing while the background write pickles them
+            'train_losses': list(self.train_losses),
+            'val_losses': list(self.val_losses),
+            'train_metrics': list(self.train_metrics),
+            'val_metrics': list(self.val_metrics),
+            'lrs': list(self.lrs),
             'best_val_f1': self.best_val_f1,
             'config': {
                 'model_name': self.model_name,
                 'batch_size': self.batch_size,
+                'accum_steps': self.accum_steps,
                 'learning_rate': self.learning_rate,
-                'image_size': self.image_size
+                'image_size': self.image_size,
+                'amp_dtype': str(self.amp_dtype)
             }
         }
         
-        # Save regular checkpoint
-        checkpoint_path = os.path.join(checkpoint_dir, f"checkpoint_epoch_{epoch+1}.pth")
-        torch.save(checkpoint, checkpoint_path)
+        paths = [os.path.join(checkpoint_dir, "latest.pth")]
+        if (epoch + 1) % 25 == 0:
+            paths.append(os.path.join(checkpoint_dir, f"checkpoint_epoch_{epoch+1}.pth"))
+        if is_best:
+            paths.append(os.path.join(checkpoint_dir, "best_model.pth"))
+        
+        self.pending_checkpoints.append(self.checkpoint_executor.submit(self._write_checkpoint, checkpoint, paths))
         
-        # Save best model
         if is_best:
-            best_path = os.path.join(checkpoint_dir, "best_model.pth")
-            torch.save(checkpoint, best_path)
             print(f"New best model saved! Val F1: {self.best_val_f1:.4f}")
     
+    @staticmethod
+    def _write_checkpoint(checkpoint: Dict, paths: List[str]):
+        """Pickle the checkpoint once, then copy the file to the remaining paths"""
+        torch.save(checkpoint, paths[0])
+        for path in paths[1:]:
+            shutil.copyfile(paths[0], path)
+    
+    def wait_for_checkpoints(self):
+        """Block until queued checkpoint writes finish, re-raising any write error"""
+        for future in self.pending_checkpoints:
+            future.result()
+        self.pending_checkpoints = []
+    
     def plot_training_history(self):
         """Plot training history"""
         fig, axes = plt.subplots(2, 2, figsize=(15, 10))
@@ -358,8 +717,7 @@ class SkinConditionTrainer:
         axes[1, 0].grid(True)
         
         # Learning rate plot
-        lr_values = [self.scheduler.get_last_lr()[0] for _ in epochs]
-        axes[1, 1].plot(epochs, lr_values)
+        axes[1, 1].plot(epochs, self.lrs)
         axes[1, 1].set_title('Learning Rate')
         axes[1, 1].set_xlabel('Epoch')
         axes[1, 1].set_ylabel('Learning Rate')
@@ -367,13 +725,19 @@ class SkinConditionTrainer:
         
         plt.tight_layout()
         plt.savefig('training_history.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        
+        # Set HEADLESS=1 on servers/CI so training doesn't block on the plot window
+        if not os.environ.get('HEADLESS'):
+            plt.show()
+        plt.close(fig)
     
     def train(self):
         """Main training loop"""
         print("Starting training...")
         print(f"Model: {self.model_name}")
         print(f"Batch size: {self.batch_size}")
+        if self.accum_steps > 1:
+            print(f"Gradient accumulation: {self.accum_steps} steps (effective batch size {self.batch_size * self.accum_steps})")
         print(f"Learning rate: {self.learning_rate}")
         print(f"Epochs: {self.num_epochs}")
         print(f"Device: {self.device}")
@@ -385,6 +749,10 @@ class SkinConditionTrainer:
             print(f"Epoch {epoch+1}/{self.num_epochs}")
             print(f"{'='*50}")
             
+            # Reshuffle this rank's shard of the training set
+            if self.distributed:
+                self.train_loader.sampler.set_epoch(epoch)
+            
             # Train
             train_metrics = self.train_epoch(epoch)
             self.train_losses.append(train_metrics['loss'])
@@ -395,7 +763,9 @@ class SkinConditionTrainer:
             self.val_losses.append(val_metrics['loss'])
             self.val_metrics.append(val_metrics)
             
-            # Update scheduler
+            # Update scheduler, recording the LR this epoch trained with
+            current_lr = self.scheduler.get_last_lr()[0]
+            self.lrs.append(current_lr)
             self.scheduler.step()
             
             # Print epoch results
@@ -407,10 +777,13 @@ class SkinConditionTrainer:
             is_best = val_metrics['macro_f1'] > self.best_val_f1
             if is_best:
                 self.best_val_f1 = val_metrics['macro_f1']
-                self.best_model_state = self.model.state_dict().copy()
             
-            # Save checkpoint
-            if (epoch + 1) % 10 == 0 or is_best:
+            stop_early = epoch > 20 and val_metrics['macro_f1'] < 0.3
+            
+            # Save checkpoint; plain epochs only snapshot every checkpoint_every epochs
+            save_now = (is_best or stop_early or epoch == self.num_epochs - 1
+                        or (epoch + 1) % self.checkpoint_every == 0 or (epoch + 1) % 25 == 0)
+            if self.is_main_process and save_now:
                 self.save_checkpoint(epoch, is_best)
             
             # Log to wandb
@@ -423,11 +796,11 @@ class SkinConditionTrainer:
                     'val/loss': val_metrics['loss'],
                     'val/f1': val_metrics['macro_f1'],
                     'val/accuracy': val_metrics['accuracy'],
-                    'lr': self.scheduler.get_last_lr()[0]
+                    'lr': current_lr
                 })
             
             # Early stopping check
-            if epoch > 20 and val_metrics['macro_f1'] < 0.3:
+            if stop_early:
                 print("Early stopping triggered - validation F1 too low")
                 break
         
@@ -435,11 +808,24 @@ class SkinConditionTrainer:
         print(f"\nTraining completed in {training_time/3600:.2f} hours")
         print(f"Best validation F1: {self.best_val_f1:.4f}")
         
-        # Plot training history
-        self.plot_training_history()
-        
-        # Save final model
-        self.save_checkpoint(self.num_epochs - 1)
+        if self.is_main_process:
+            # Plot training history
+            self.plot_training_history()
+            
+            # The final model is latest.pth; make sure it is on disk before returning
+            self.wait_for_checkpoints()
+            
+            if self.quantize_eval:
+                self.int8_val_metrics = self.evaluate_int8()
+                print(f"Int8 validation F1: {self.int8_val_metrics['macro_f1']:.4f} "
+                      f"(fp32 best: {self.best_val_f1:.4f}), "
+                      f"Acc: {self.int8_val_metrics['accuracy']:.4f}")
+                if self.use_wandb:
+                    wandb.log({
+                        'val_int8/loss': self.int8_val_metrics['loss'],
+                        'val_int8/f1': self.int8_val_metrics['macro_f1'],
+                        'val_int8/accuracy': self.int8_val_metrics['accuracy']
+                    })
         
         if self.use_wandb:
             wandb.finish()
@@ -459,6 +845,24 @@ def main():
     parser.add_argument('--pretrained', action='store_true', help='Use pretrained weights for backbone')
     parser.add_argument('--max-train-batches', type=int, default=None, help='Limit number of training batches per epoch (for quick tests)')
     parser.add_argument('--max-val-batches', type=int, default=None, help='Limit number of validation batches per epoch (for quick tests)')
+    parser.add_argument('--accum-steps', type=int, default=1,
+                       help='Accumulate gradients over N batches per optimizer step (effective batch = N x batch size)')
+    parser.add_argument('--num-workers', type=int, default=None,
+                       help='DataLoader worker processes (default: min(8, CPU count))')
+    parser.add_argument('--compile', action='store_true',
+                       help='Compile the model with torch.compile (CUDA, PyTorch 2.0+)')
+    parser.add_argument('--grad-checkpointing', action='store_true',
+                       help='Recompute backbone activations in backward to cut memory (allows larger batches)')
+    parser.add_argument('--amp-dtype', type=str, default='auto', choices=['auto', 'bf16', 'fp16', 'none'],
+                       help='Mixed precision dtype (auto picks bf16 when supported, else fp16)')
+    parser.add_argument('--gpu-augment', action='store_true',
+                       help='Load uint8 images and flip/normalize them on the training device')
+    parser.add_argument('--cuda-graph', action='store_true',
+                       help='Capture the whole training step as a CUDA graph and replay it per batch')
+    parser.add_argument('--checkpoint-every', type=int, default=5,
+                       help='Refresh checkpoints/latest.pth every N epochs (best and final epochs always save)')
+    parser.add_argument('--quantize-eval', action='store_true',
+                       help='After training, also validate a post-training int8 copy of the best model (on CPU)')
     
     args = parser.parse_args()
     
@@ -474,13 +878,25 @@ def main():
         experiment_name=args.experiment_name,
         pretrained=args.pretrained,
         max_train_batches=args.max_train_batches,
-        max_val_batches=args.max_val_batches
+        max_val_batches=args.max_val_batches,
+        amp_dtype=args.amp_dtype,
+        num_workers=args.num_workers,
+        grad_checkpointing=args.grad_checkpointing,
+        accum_steps=args.accum_steps,
+        compile=args.compile,
+        gpu_augment=args.gpu_augment,
+        cuda_graph=args.cuda_graph,
+        quantize_eval=args.quantize_eval,
+        checkpoint_every=args.checkpoint_every
     )
     
     # Setup and train
     trainer.setup_data()
     trainer.setup_model()
     trainer.train()
+    
+    if trainer.distributed:
+        dist.destroy_process_group()
 
 
 if __name__ == "__main__":